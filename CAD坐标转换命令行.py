@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CAD坐标转换器 - 命令行版
+版本: 1.4.0
+作者: ViVi141
+邮箱: 747384120@qq.com
+描述: 无界面批量转换坐标文件，不导入tkinter和matplotlib，适合在服务器上批量运行
+
+用法示例:
+  python CAD坐标转换命令行.py 坐标.txt
+  python CAD坐标转换命令行.py 坐标.txt -t pline --grouped -o 结果.txt
+  python CAD坐标转换命令行.py data/*.txt -t point -o 输出目录
+  python CAD坐标转换命令行.py 坐标.txt --group 第3组 --group 第5组
+  python CAD坐标转换命令行.py 坐标.txt -t pline --grouped -f dxf
+  python CAD坐标转换命令行.py 坐标.txt -t pline --grouped -f lisp
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+from 坐标转换引擎 import (VERSION, CONVERT_TYPES, SOURCE_PRECISION, TEXT_FORMATS, export_file, export_script_file,
+                          stream_export_file)
+from DXF输出 import export_dxf_file
+
+# 输出格式：CAD命令文本、AutoLISP程序、分卷脚本、文本DXF、二进制DXF
+OUTPUT_FORMATS = TEXT_FORMATS + ("scr", "dxf", "dxf-binary")
+
+# 未指定输出路径时，结果文件名的后缀
+OUTPUT_SUFFIX = "_CAD命令.txt"
+OUTPUT_SUFFIXES = {"commands": OUTPUT_SUFFIX, "lisp": "_CAD程序.lsp", "scr": ".scr", "dxf": ".dxf",
+                   "dxf-binary": ".dxf"}
+
+
+def parse_precision(value):
+    """-p 参数：小数位数，或 source 表示直接输出坐标原文"""
+    if value == SOURCE_PRECISION:
+        return value
+    try:
+        precision = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"应为非负整数或 {SOURCE_PRECISION}: {value}")
+    if precision < 0:
+        raise argparse.ArgumentTypeError(f"小数位数不能为负数: {value}")
+    return precision
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        description=f"CAD坐标转换器 v{VERSION} - 将TXT坐标文件批量转换为CAD命令")
+    parser.add_argument("inputs", nargs="+", metavar="输入文件",
+                        help="坐标TXT文件，可指定多个")
+    parser.add_argument("-t", "--type", dest="convert_type", choices=CONVERT_TYPES, default="line",
+                        help="转换类型 (默认: line)")
+    parser.add_argument("-p", "--precision", type=parse_precision, metavar="位数",
+                        help=f"坐标保留的小数位数；{SOURCE_PRECISION} 表示直接输出源文件中的坐标原文，不用于DXF；"
+                             "二进制DXF总是完整精度 (默认: 完整精度)")
+    parser.add_argument("-f", "--format", dest="output_format", choices=OUTPUT_FORMATS, default="commands",
+                        help="输出格式：commands 为CAD命令文本，lisp 为用 entmake 创建实体的 AutoLISP 程序，"
+                             "scr 为按 --max-bytes/--max-lines 分卷的脚本文件，"
+                             "dxf/dxf-binary 直接写出 R12 DXF 文件 (默认: commands)")
+    parser.add_argument("--max-bytes", type=int, metavar="字节数",
+                        help="-f scr 时每个脚本分卷的最大字节数，只在分组边界处切分")
+    parser.add_argument("--max-lines", type=int, metavar="行数",
+                        help="-f scr 时每个脚本分卷的最大行数，只在分组边界处切分")
+    parser.add_argument("-g", "--grouped", action="store_true",
+                        help="按分组分别处理（文件包含多个分组时生效）")
+    parser.add_argument("-o", "--output", metavar="输出路径",
+                        help="输出文件；多个输入文件时为输出目录；'-' 表示输出到标准输出。"
+                             f"默认在输入文件旁生成 <文件名>{OUTPUT_SUFFIX}（其他格式见 -f）")
+    parser.add_argument("--group", dest="groups", action="append", metavar="分组名",
+                        help="只转换指定分组，可重复使用；通过分组索引只读取这些分组")
+    parser.add_argument("--stream", action="store_true",
+                        help="不分组转换时边读取边转换写出，内存占用与文件大小无关，结果与普通转换相同"
+                             "（只用于 commands 格式，不能与 -g、--group、--cache、-j 同时使用）")
+    parser.add_argument("--cache", action="store_true",
+                        help="使用坐标文件旁的二进制缓存：较大的文件解析后写入缓存，文件未修改时再次转换直接读取，不重新解析")
+    parser.add_argument("-j", "--jobs", type=int, metavar="进程数",
+                        help="并行解析和按分组并行生成命令的进程数 (默认: 数据较大时按CPU核数自动并行，1 表示不并行)")
+    parser.add_argument("--encoding", default="utf-8",
+                        help="输入文件编码 (默认: utf-8)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="不输出处理信息")
+    parser.add_argument("-V", "--version", action="version", version=f"%(prog)s {VERSION}")
+    return parser
+
+
+def resolve_output_path(input_path, output, multiple, suffix=OUTPUT_SUFFIX):
+    """根据输入文件和 -o 参数确定输出文件路径，返回 None 表示输出到标准输出"""
+    if output == "-":
+        return None
+
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    if output is None:
+        return os.path.join(os.path.dirname(os.path.abspath(input_path)), stem + suffix)
+    if multiple or os.path.isdir(output):
+        return os.path.join(output, stem + suffix)
+    return output
+
+
+def export(input_path, output, args):
+    """按 -f 指定的格式转换单个文件并写入 output（路径或标准输出），返回 (坐标点数, 分组数)"""
+    if args.stream:
+        result = stream_export_file(input_path, sys.stdout if output is None else output, args.convert_type,
+                                    encoding=args.encoding, precision=args.precision)
+        return result.point_count, result.group_count
+
+    if args.output_format in TEXT_FORMATS:
+        store = export_file(input_path, sys.stdout if output is None else output,
+                            args.convert_type, args.grouped, encoding=args.encoding,
+                            group_names=args.groups, workers=args.jobs, precision=args.precision,
+                            text_format=args.output_format, cache=args.cache)
+    elif args.output_format == "scr":
+        store = export_script_file(input_path, output, args.convert_type, args.grouped, encoding=args.encoding,
+                                   group_names=args.groups, workers=args.jobs, precision=args.precision,
+                                   max_bytes=args.max_bytes, max_lines=args.max_lines, cache=args.cache)
+    else:
+        binary = args.output_format == "dxf-binary"
+        if output is None:
+            output = sys.stdout.buffer if binary else sys.stdout
+        store = export_dxf_file(input_path, output, args.convert_type, args.grouped, binary,
+                                encoding=args.encoding, group_names=args.groups, workers=args.jobs,
+                                precision=args.precision, cache=args.cache)
+    return len(store), len(store.groups)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    multiple = len(args.inputs) > 1
+    if args.output_format == "scr" and args.output == "-":
+        parser.error("分卷脚本 (-f scr) 不能输出到标准输出")
+    if args.stream and (args.grouped or args.groups or args.output_format != "commands"):
+        parser.error("--stream 只用于不分组的 commands 格式转换")
+    if args.stream and (args.cache or args.jobs is not None):
+        parser.error("--stream 边读取边转换，不能与 --cache、-j 同时使用")
+    if args.output_format != "scr" and (args.max_bytes is not None or args.max_lines is not None):
+        parser.error("--max-bytes、--max-lines 只用于分卷脚本 (-f scr)")
+    if args.output_format == "dxf-binary" and args.precision is not None:
+        parser.error("二进制DXF按完整精度写出坐标，不能使用 -p")
+    if args.output_format == "dxf" and args.precision == SOURCE_PRECISION:
+        parser.error(f"DXF 输出不支持 -p {SOURCE_PRECISION}，请指定小数位数")
+
+    if multiple and args.output not in (None, "-"):
+        os.makedirs(args.output, exist_ok=True)
+
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    suffix = OUTPUT_SUFFIXES[args.output_format]
+    failed = 0
+    for input_path in args.inputs:
+        output_path = resolve_output_path(input_path, args.output, multiple, suffix)
+        # 先写入临时文件，避免没有有效坐标或转换失败时留下不完整的结果；分卷脚本直接写出各分卷
+        temp_path = None if output_path is None or args.output_format == "scr" else output_path + ".part"
+        try:
+            point_count, group_count = export(input_path, temp_path or output_path, args)
+            if point_count and output_path is None:
+                if args.output_format in TEXT_FORMATS:
+                    sys.stdout.write("\n")
+                sys.stdout.flush()
+            elif point_count and temp_path is not None:
+                os.replace(temp_path, output_path)
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            log(f"错误：无法转换 {input_path}: {e}")
+            failed += 1
+            continue
+        finally:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        if not point_count:
+            log(f"警告：{input_path} 中未找到有效的坐标数据")
+            failed += 1
+            continue
+
+        log(f"{input_path}: 共{point_count}个坐标点, {group_count}个分组 -> {output_path or '标准输出'}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # 打包为exe后，并行解析的子进程需要由此进入
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -9,18 +9,39 @@ CAD坐标转换器
 """
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
-import re
+from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog
+import tkinter.font as tkfont
 import os
 import sys
 import platform
+import multiprocessing
+import queue
+import threading
 import matplotlib.pyplot as plt
 import numpy as np
 
-# 版本信息
-VERSION = "1.4.0"
-AUTHOR = "ViVi141"
-EMAIL = "747384120@qq.com"
+from 坐标转换引擎 import (VERSION, AUTHOR, EMAIL, CoordinateStore, CommandOutput, ConversionCancelled,
+                          check_cancelled, parse_coordinates, parse_coordinate_file_cached,
+                          get_cached_store, uses_sidecar, preview_file,
+                          get_group_index, as_points,
+                          has_z_coordinates, iter_conversion_commands,
+                          generate_cad_commands, iter_lisp_program, select_groups, export_script_parts,
+                          SOURCE_PRECISION)
+from DXF输出 import write_dxf
+from 预览抽稀 import PreviewPyramid, data_bounds, merge_bounds, line_budget, line_segments
+
+# 命令超过该大小时一键复制改为分段复制（字节），以及默认的每段大小（KB）
+CLIPBOARD_CHUNK_THRESHOLD = 4 * 1024 * 1024
+CLIPBOARD_CHUNK_KB = 512
+
+# 分卷导出脚本时默认的分卷大小（KB）
+SCRIPT_PART_KB = 1024
+
+# 输出格式下拉框的显示文本
+TEXT_FORMAT_LABELS = {"CAD命令": "commands", "AutoLISP": "lisp"}
+
+# 后台转换进度队列的轮询间隔（毫秒）
+WORKER_POLL_INTERVAL = 100
 
 # 检查matplotlib可用性
 HAS_MATPLOTLIB = False
@@ -29,7 +50,10 @@ try:
     # 设置matplotlib后端为TkAgg，避免创建额外进程
     matplotlib.use('TkAgg')
     import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection
     import numpy as np
     HAS_MATPLOTLIB = True
     
@@ -42,6 +66,318 @@ try:
 except ImportError:
     print("警告：matplotlib未安装，图形预览功能不可用")
 
+class CommandViewer(tk.Frame):
+    """CAD命令分页查看器：内容保存在 CommandOutput 中，文本框只渲染当前可见的几十行"""
+    
+    def __init__(self, parent, font=('Consolas', 10), **kwargs):
+        super().__init__(parent, bg='white', **kwargs)
+        self.output = None
+        self.top_line = 0
+        self.match_line = None
+        self.line_height = max(1, tkfont.Font(font=font).metrics('linespace'))
+        
+        # 工具栏：分组跳转、查找、行号信息
+        toolbar = tk.Frame(self, bg='white')
+        toolbar.pack(fill=tk.X, pady=(0, 5))
+        
+        tk.Label(toolbar, text="跳转分组:", bg='white').pack(side=tk.LEFT)
+        self.group_var = tk.StringVar()
+        self.group_combo = ttk.Combobox(toolbar, textvariable=self.group_var, state='readonly', width=20)
+        self.group_combo.pack(side=tk.LEFT, padx=(5, 15))
+        self.group_combo.bind('<<ComboboxSelected>>', self.on_group_selected)
+        
+        tk.Label(toolbar, text="查找:", bg='white').pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(toolbar, textvariable=self.search_var, width=20)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind('<Return>', lambda e: self.find_next())
+        ttk.Button(toolbar, text="查找下一个", command=self.find_next).pack(side=tk.LEFT)
+        
+        self.info_label = tk.Label(toolbar, text="", bg='white', fg='#6c757d')
+        self.info_label.pack(side=tk.RIGHT)
+        
+        # 文本区域：纵向滚动条由本类按行号驱动，横向滚动条直接交给文本框
+        body = tk.Frame(self, bg='white')
+        body.pack(fill=tk.BOTH, expand=True)
+        self.v_scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(body, height=20, font=font, wrap=tk.NONE, bg='#f8f9fa', fg='#212529',
+                            insertbackground='#212529', state=tk.DISABLED)
+        h_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
+        h_scrollbar.pack(fill=tk.X)
+        self.text.config(xscrollcommand=h_scrollbar.set)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text.tag_configure('match', background='#ffe08a')
+        
+        self.text.bind('<Configure>', lambda e: self.render())
+        self.text.bind('<MouseWheel>', self.on_mouse_wheel)
+        self.text.bind('<Button-4>', lambda e: self.scroll_by(-3))
+        self.text.bind('<Button-5>', lambda e: self.scroll_by(3))
+        for key, step in (('<Up>', -1), ('<Down>', 1)):
+            self.text.bind(key, lambda e, step=step: self.scroll_by(step) or 'break')
+        self.text.bind('<Prior>', lambda e: self.scroll_by(-self.visible_rows()) or 'break')
+        self.text.bind('<Next>', lambda e: self.scroll_by(self.visible_rows()) or 'break')
+        self.text.bind('<Control-Home>', lambda e: self.scroll_to(0) or 'break')
+        self.text.bind('<Control-End>', lambda e: self.scroll_to(self.line_count()) or 'break')
+        # 点击后获得焦点，以便使用方向键和翻页键
+        self.text.bind('<Button-1>', lambda e: self.text.focus_set())
+    
+    def set_output(self, output):
+        """显示新的命令输出"""
+        self.output = output
+        self.top_line = 0
+        self.match_line = None
+        self.group_combo['values'] = [name for name, _, _ in output.group_starts] if output else []
+        self.group_var.set('')
+        self.render()
+    
+    def clear(self):
+        """清空显示"""
+        self.set_output(None)
+    
+    def line_count(self):
+        return self.output.line_count if self.output else 0
+    
+    def visible_rows(self):
+        """文本框当前能显示的行数"""
+        return max(1, self.text.winfo_height() // self.line_height)
+    
+    def scroll_to(self, line):
+        """把第 line 行滚动到顶部（超出范围时自动截断）"""
+        rows = self.visible_rows()
+        self.top_line = max(0, min(int(line), self.line_count() - rows))
+        self.render()
+    
+    def scroll_by(self, lines):
+        self.scroll_to(self.top_line + lines)
+    
+    def on_scrollbar(self, action, value, unit=None):
+        """纵向滚动条回调：moveto 按比例定位，scroll 按行或页滚动"""
+        if action == tk.MOVETO:
+            self.scroll_to(float(value) * self.line_count())
+        elif action == tk.SCROLL:
+            step = self.visible_rows() if unit == tk.PAGES else 1
+            self.scroll_by(int(value) * step)
+    
+    def on_mouse_wheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+        return 'break'
+    
+    def on_group_selected(self, event=None):
+        name = self.group_var.get()
+        for group_name, line, _ in self.output.group_starts if self.output else []:
+            if group_name == name:
+                self.scroll_to(line)
+                break
+    
+    def find_next(self):
+        """从当前匹配行（或顶部可见行）之后查找，找到末尾后从头继续"""
+        query = self.search_var.get()
+        if not self.output or not query:
+            return
+        
+        start = self.top_line if self.match_line is None else self.match_line + 1
+        line = self.output.search(query, start)
+        if line is None and start > 0:
+            line = self.output.search(query, 0)
+        if line is None:
+            self.match_line = None
+            self.info_label.config(text=f"未找到: {query}")
+            self.render()
+            return
+        
+        self.match_line = line
+        if not self.top_line <= line < self.top_line + self.visible_rows():
+            # 把匹配行放在可见区域的上部
+            self.top_line = max(0, line - self.visible_rows() // 3)
+        self.scroll_to(self.top_line)
+    
+    def render(self):
+        """只读取并显示可见范围内的行"""
+        total = self.line_count()
+        rows = self.visible_rows()
+        lines = self.output.read_lines(self.top_line, rows + 1) if self.output else []
+        
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(1.0, tk.END)
+        self.text.insert(1.0, "\n".join(lines))
+        if self.match_line is not None and self.top_line <= self.match_line <= self.top_line + rows:
+            row = self.match_line - self.top_line + 1
+            self.text.tag_add('match', f"{row}.0", f"{row}.end")
+        self.text.config(state=tk.DISABLED)
+        
+        if total:
+            self.v_scrollbar.set(self.top_line / total, min(1.0, (self.top_line + rows) / total))
+            self.info_label.config(
+                text=f"第{self.top_line + 1}-{min(total, self.top_line + rows)}行 / 共{total}行")
+        else:
+            self.v_scrollbar.set(0, 1)
+            self.info_label.config(text="")
+
+if HAS_MATPLOTLIB:
+    class PreviewCanvas(FigureCanvasTkAgg):
+        """预览画布：可在后台线程更新图形并用 Agg 渲染
+
+        后台线程在整个绘图和渲染期间持有 render_lock，期间主线程的重绘和窗口大小变化推迟到渲染结束后（show）进行，
+        两个线程不会同时访问图形。
+        """
+        
+        def __init__(self, figure, master):
+            super().__init__(figure, master)
+            self.render_lock = threading.RLock()
+            self.redraw_pending = False
+            self.pending_resize = None
+        
+        def draw(self):
+            if not self.render_lock.acquire(blocking=False):
+                self.redraw_pending = True
+                return
+            try:
+                self.redraw_pending = False
+                super().draw()
+            finally:
+                self.render_lock.release()
+        
+        def resize(self, event):
+            if not self.render_lock.acquire(blocking=False):
+                self.pending_resize = event
+                return
+            try:
+                super().resize(event)
+            finally:
+                self.render_lock.release()
+        
+        def render(self):
+            """把图形渲染到 Agg 的 RGBA 缓冲区（不访问Tk，可在后台线程调用）"""
+            with self.render_lock:
+                renderer = self.get_renderer()
+                renderer.clear()
+                self.figure.draw(renderer)
+        
+        def show(self):
+            """在主线程把渲染结果复制到 Tk 的 PhotoImage；渲染期间窗口大小变化过或请求过重绘时重新绘制"""
+            if self.pending_resize is not None:
+                event, self.pending_resize = self.pending_resize, None
+                self.resize(event)
+                self.redraw_pending = True
+            if self.redraw_pending:
+                self.draw()
+            else:
+                self.blit()
+
+class PreviewView:
+    """图形预览的一个视图（2D或3D）：Figure、画布和坐标轴只创建一次，
+    再次绘图时按名称复用已有的线条和线段集合，原地更新坐标后在空闲时重绘。
+    2D视图缩放或平移后，从各图层的多分辨率金字塔重新取出可见范围内的坐标"""
+    
+    def __init__(self, master, figsize, projection=None):
+        # 不经过 pyplot 创建 Figure，图形不会留在 pyplot 的全局列表中，也就不需要 plt.close
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot(111, projection=projection)
+        self.is_3d = projection == '3d'
+        self.widget = tk.Frame(master, bg='white')
+        self.canvas = PreviewCanvas(self.figure, self.widget)
+        # 工具栏提供缩放和平移
+        self.toolbar = NavigationToolbar2Tk(self.canvas, self.widget)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.artists = {}
+        self.used = set()
+        # 后台线程正在绘图和渲染，主线程不修改图形
+        self.busy = False
+        
+        # 抽稀图层 [(PreviewPyramid, 绘制函数, 点数上限)] 及其当前显示的范围
+        self.layers = []
+        self.layer_window = None
+        self.refresh_pending = False
+        if not self.is_3d:
+            self.ax.callbacks.connect('xlim_changed', self.on_limits_changed)
+            self.ax.callbacks.connect('ylim_changed', self.on_limits_changed)
+    
+    def begin(self):
+        """开始一次绘图：移除标注文字和抽稀图层，线条和线段集合留待复用"""
+        self.used = set()
+        self.layers = []
+        for text in list(self.ax.texts):
+            text.remove()
+    
+    def visible_window(self):
+        """当前可见范围 (x_min, x_max, y_min, y_max)"""
+        x_min, x_max = sorted(self.ax.get_xlim())
+        y_min, y_max = sorted(self.ax.get_ylim())
+        return x_min, x_max, y_min, y_max
+    
+    def canvas_size(self):
+        """坐标轴区域的像素大小 (宽, 高)，用于按画布分辨率抽稀"""
+        bbox = self.ax.get_window_extent()
+        return bbox.width, bbox.height
+    
+    def set_layers(self, layers):
+        """设置抽稀图层并按当前可见范围绘制，返回显示的点数；
+        layers 为 [(PreviewPyramid, 绘制函数, 点数上限)]，绘制函数接收抽稀后的坐标数组"""
+        self.layers = layers
+        return self.refresh_layers()
+    
+    def refresh_layers(self):
+        """从各图层的金字塔取出可见范围内的坐标并重新绘制，返回显示的点数"""
+        window = self.visible_window()
+        size = self.canvas_size()
+        shown = 0
+        for pyramid, draw, max_points in self.layers:
+            display_points = pyramid.query(window, size, max_points)
+            draw(display_points)
+            shown += len(display_points)
+        self.layer_window = window
+        return shown
+    
+    def on_limits_changed(self, ax):
+        """缩放或平移后在空闲时刷新抽稀图层（X、Y范围同时变化时只刷新一次）"""
+        if self.layers and not self.refresh_pending and not self.busy:
+            self.refresh_pending = True
+            self.widget.after_idle(self.on_refresh)
+    
+    def on_refresh(self):
+        self.refresh_pending = False
+        if self.layers and not self.busy and self.visible_window() != self.layer_window:
+            self.refresh_layers()
+            self.canvas.draw_idle()
+    
+    def line(self, key, coordinates, label=None, **style):
+        """折线或标记（style 为 Line2D 属性）；coordinates 为 (x, y) 或 (x, y, z)"""
+        line = self.artists.get(key)
+        if line is None:
+            line = self.artists[key] = self.ax.plot(*coordinates, **style)[0]
+        elif self.is_3d:
+            line.set_data_3d(*coordinates)
+        else:
+            line.set_data(*coordinates)
+        line.set(label=label, **style)
+        self.used.add(key)
+        return line
+    
+    def segments(self, key, segments, label=None, **style):
+        """线段集合（LineCollection/Line3DCollection），segments 为 N x 2 x 维数 数组"""
+        collection = self.artists.get(key)
+        if collection is None:
+            if self.is_3d:
+                collection = Line3DCollection(segments)
+                self.ax.add_collection3d(collection)
+            else:
+                collection = LineCollection(segments)
+                self.ax.add_collection(collection)
+            self.artists[key] = collection
+        else:
+            collection.set_segments(segments)
+        collection.set(label=label, **style)
+        self.used.add(key)
+        return collection
+    
+    def finish(self, **legend_options):
+        """移除本次绘图没有用到的图形元素，添加图例（参数同 ax.legend）；渲染由调用方进行"""
+        for key in list(self.artists):
+            if key not in self.used:
+                self.artists.pop(key).remove()
+        self.ax.legend(**legend_options)
+
 class CAD坐标转换器:
     def __init__(self, root):
         self.root = root
@@ -57,9 +393,32 @@ class CAD坐标转换器:
         self.font_title = ('Microsoft YaHei', 14, 'bold')
         self.font_subtitle = ('Microsoft YaHei', 11, 'bold')
         
-        # 存储坐标数据
-        self.coordinates = []
-        self.coordinate_groups = {}  # 存储分组坐标数据
+        # 存储坐标数据：store 为列式存储，coordinates/coordinate_groups 为其列表/字典视图
+        self.set_store(CoordinateStore())
+        # 当前结果对应的转换选项 (convert_type, grouped, precision, text_format)
+        self.result_options = None
+        # 生成的CAD命令保存在磁盘缓存中，界面只显示可见的行
+        self.command_output = None
+        # 分组复制时按 (转换类型, 小数位数, 分组名) 缓存单独生成的分组命令，坐标数据变化时清空
+        self.group_command_cache = {}
+        # 打开着的分组复制对话框，结果被替换时关闭
+        self.group_copy_dialog = None
+        # 图形预览视图（'2d'/'3d' -> PreviewView），第一次绘图时创建，之后原地更新
+        self.preview_views = {}
+        # 后台渲染预览的状态：请求序号（清空结果时也递增，使进行中的渲染结果作废）、
+        # 是否正在渲染、渲染期间收到的最新请求，以及占位提示控件
+        self.preview_generation = 0
+        self.preview_rendering = False
+        self.preview_request = None
+        self.preview_placeholder = None
+        
+        # 后台转换状态
+        self.converting = False
+        self.conversion_thread = None
+        self.conversion_queue = None
+        self.cancel_event = threading.Event()
+        # 数据预览在后台建立分组索引时的取消事件；选择新文件或开始转换时取消
+        self.index_cancel_event = None
         
         self.setup_ui()
         self.setup_keyboard_shortcuts()
@@ -170,6 +529,24 @@ class CAD坐标转换器:
         # self.text_height_var = tk.StringVar(value="5")
         # ttk.Entry(text_height_frame, textvariable=self.text_height_var, width=8).pack(side=tk.LEFT, padx=(5, 0))
         
+        # 坐标小数位数："完整" 表示完整精度，"原文" 表示直接输出源文件中的坐标文本
+        precision_frame = tk.Frame(options_frame, bg='white')
+        precision_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        tk.Label(precision_frame, text="小数位数:", bg='white').pack(side=tk.LEFT)
+        self.precision_var = tk.StringVar(value="完整")
+        ttk.Combobox(precision_frame, textvariable=self.precision_var, state='readonly', width=6,
+                     values=["完整", "原文"] + [str(i) for i in range(9)]).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # 输出格式：逐条执行的CAD命令，或用 entmake 直接创建实体的 AutoLISP 程序
+        format_frame = tk.Frame(options_frame, bg='white')
+        format_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        tk.Label(format_frame, text="输出格式:", bg='white').pack(side=tk.LEFT)
+        self.text_format_var = tk.StringVar(value="CAD命令")
+        ttk.Combobox(format_frame, textvariable=self.text_format_var, state='readonly', width=10,
+                     values=list(TEXT_FORMAT_LABELS)).pack(side=tk.LEFT, padx=(5, 0))
+        
         # 分组处理选项
         self.group_processing_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(options_frame, text="按分组分别处理", 
@@ -180,13 +557,26 @@ class CAD坐标转换器:
         ttk.Checkbutton(options_frame, text="转换后自动复制", 
                        variable=self.auto_copy_var).pack(anchor=tk.W, pady=(10, 0))
         
+        # 二进制缓存选项：与命令行的 --cache 相同，默认不在坐标文件旁写入缓存文件
+        self.sidecar_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="使用缓存文件（大文件旁写入 .npy）", 
+                       variable=self.sidecar_var).pack(anchor=tk.W, pady=(5, 0))
+        
         # 转换按钮
         convert_frame = tk.Frame(left_frame, bg='white')
         convert_frame.pack(fill=tk.X, padx=15, pady=15)
         
-        convert_btn = ttk.Button(convert_frame, text="开始转换", 
-                                command=self.convert_coordinates)
-        convert_btn.pack(fill=tk.X, pady=(0, 10))
+        self.convert_btn = ttk.Button(convert_frame, text="开始转换", 
+                                     command=self.convert_coordinates)
+        self.convert_btn.pack(fill=tk.X, pady=(0, 5))
+        
+        # 取消按钮和进度条（转换进行中可用）
+        self.cancel_btn = ttk.Button(convert_frame, text="取消转换", 
+                                    command=self.cancel_conversion, state=tk.DISABLED)
+        self.cancel_btn.pack(fill=tk.X, pady=(0, 5))
+        
+        self.progress_bar = ttk.Progressbar(convert_frame, mode='determinate', maximum=100)
+        self.progress_bar.pack(fill=tk.X, pady=(0, 10))
         
         # 操作按钮组
         button_frame = tk.Frame(left_frame, bg='white')
@@ -194,6 +584,9 @@ class CAD坐标转换器:
         
         ttk.Button(button_frame, text="一键复制", command=self.copy_to_cad).pack(fill=tk.X, pady=2)
         ttk.Button(button_frame, text="保存文件", command=self.save_to_file).pack(fill=tk.X, pady=2)
+        ttk.Button(button_frame, text="分段复制", command=self.show_chunked_copy_dialog).pack(fill=tk.X, pady=2)
+        ttk.Button(button_frame, text="分卷导出脚本", command=self.export_scripts).pack(fill=tk.X, pady=2)
+        ttk.Button(button_frame, text="导出DXF", command=self.export_dxf).pack(fill=tk.X, pady=2)
         ttk.Button(button_frame, text="清空结果", command=self.clear_results).pack(fill=tk.X, pady=2)
         
         return left_frame
@@ -224,9 +617,8 @@ class CAD坐标转换器:
         cad_frame = tk.Frame(notebook, bg='white')
         notebook.add(cad_frame, text="🎯 CAD命令")
         
-        self.cad_text = scrolledtext.ScrolledText(cad_frame, height=20, font=('Consolas', 10),
-                                                 bg='#f8f9fa', fg='#212529', insertbackground='#212529')
-        self.cad_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.cad_viewer = CommandViewer(cad_frame, font=('Consolas', 10))
+        self.cad_viewer.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # 预览选项卡
         preview_frame = tk.Frame(notebook, bg='white')
@@ -259,64 +651,68 @@ class CAD坐标转换器:
             self.preview_file_content()
     
     def preview_file_content(self):
+        """预览文件开头和结尾，只读取有限的字节数，不会加载整个文件"""
+        self.cancel_group_indexing()
+        file_path = self.file_path_var.get()
         try:
-            with open(self.file_path_var.get(), 'r', encoding='utf-8') as f:
-                content = f.read()
-                self.preview_text.delete(1.0, tk.END)
-                self.preview_text.insert(1.0, content[:1000] + "..." if len(content) > 1000 else content)
+            preview = preview_file(file_path)
         except Exception as e:
             messagebox.showerror("错误", f"无法读取文件: {str(e)}")
-    
-    def parse_coordinates(self, content):
-        """解析坐标数据"""
-        coordinates = []
-        groups = {}  # 存储分组坐标数据
-        current_group = "默认组"
-        
-        # 编译正则表达式以提高性能 - 支持科学计数法，更严格的匹配
-        coord_pattern = re.compile(r'^\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)\s*,\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)\s*,?\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)?\s*$')
+            return
         
-        lines = content.split('\n')
+        if preview.size >= 1024 * 1024:
+            size_text = f"{preview.size/1024/1024:.1f}MB"
+        else:
+            size_text = f"{preview.size/1024:.1f}KB"
+        if preview.exact:
+            stats = f"文件大小: {size_text}，共{preview.line_count}行，{preview.group_count}个分组"
+        else:
+            stats = (f"文件大小: {size_text}，约{preview.line_count}行，"
+                     f"前{preview.sample_size // 1024}KB中发现{preview.group_count}个分组")
         
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-                
-            # 检查是否是分组标识
-            if line.startswith('第') and '组' in line:
-                current_group = line
-                if current_group not in groups:
-                    groups[current_group] = []
-                continue
-                
-            # 匹配坐标格式: x, y, z (可选)
-            match = coord_pattern.match(line)
-            if match:
-                try:
-                    x, y, z = match.group(1), match.group(2), match.group(3) if match.group(3) else "0"
-                    coord = (float(x), float(y), float(z))
-                    
-                    # 验证坐标值的合理性
-                    if abs(coord[0]) > 1e10 or abs(coord[1]) > 1e10 or abs(coord[2]) > 1e10:
-                        print(f"警告：跳过异常坐标值: {coord}")
-                        continue
-                        
-                    coordinates.append(coord)
-                    
-                    # 同时添加到分组中
-                    if current_group not in groups:
-                        groups[current_group] = []
-                    groups[current_group].append(coord)
-                except ValueError:
-                    # 跳过无效的坐标数据
-                    print(f"警告：跳过无效坐标: {line}")
-                    continue
+        content = preview.head
+        if preview.tail is not None:
+            content += "\n...\n" + preview.tail
         
-        # 存储分组数据
-        self.coordinate_groups = groups
+        self.preview_text.delete(1.0, tk.END)
+        self.preview_text.insert(1.0, stats + "\n" + "-" * 40 + "\n" + content)
         
-        return coordinates
+        if not preview.exact:
+            # 大文件在后台建立分组索引，完成后把估算值替换为精确的行数和分组数
+            cancel_event = self.index_cancel_event = threading.Event()
+            
+            def build_index():
+                index = get_group_index(file_path, cancel_event)
+                return index, index and len(index.group_names)
+            
+            def on_indexed(result):
+                index, group_count = result
+                if index is None or cancel_event.is_set() or self.file_path_var.get() != file_path:
+                    return
+                total_lines = int(index.line_ranges[-1, 1])
+                self.preview_text.delete('1.0', '1.end')
+                self.preview_text.insert('1.0', f"文件大小: {size_text}，共{total_lines}行，{group_count}个分组")
+            
+            self.run_background_task(build_index, on_indexed, lambda e: None)
+    
+    def cancel_group_indexing(self):
+        """取消数据预览中仍在进行的分组索引扫描，避免与新的预览或转换争用磁盘"""
+        if self.index_cancel_event is not None:
+            self.index_cancel_event.set()
+            self.index_cancel_event = None
+    
+    def set_store(self, store):
+        """设置当前坐标数据"""
+        if getattr(self, 'store', None) is not store:
+            self.group_command_cache = {}
+        self.store = store
+        self.coordinates = store.coordinates
+        self.coordinate_groups = store.groups  # 存储分组坐标数据
+    
+    def parse_coordinates(self, content):
+        """解析坐标数据"""
+        self.set_store(parse_coordinates(content, warn=print))
+        return self.coordinates
     
     def setup_keyboard_shortcuts(self):
         """设置键盘快捷键"""
@@ -330,6 +726,8 @@ class CAD坐标转换器:
         self.root.bind('<Control-s>', lambda e: self.save_to_file())
         # Ctrl+L: 清空结果
         self.root.bind('<Control-l>', lambda e: self.clear_results())
+        # Esc: 取消转换
+        self.root.bind('<Escape>', lambda e: self.cancel_conversion())
         # F1: 帮助信息
         self.root.bind('<F1>', lambda e: self.show_help())
     
@@ -344,6 +742,7 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
 
 转换操作:
   Ctrl+Enter 执行坐标转换
+  Esc       取消正在进行的转换
   Ctrl+C    复制CAD命令到剪贴板
   Ctrl+L    清空结果显示
 
@@ -365,156 +764,45 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
 分组处理:
 - 默认忽略分组，所有坐标合并处理
 - 勾选"按分组分别处理"可分别生成每个组的CAD命令
+- 输出格式选择"AutoLISP"时生成用 entmake 直接创建实体的程序，在CAD中执行比逐条命令快得多
 
 作者: {AUTHOR} ({EMAIL})
         """
         messagebox.showinfo("快捷键帮助", help_text)
     
-    def generate_cad_commands(self, coordinates, is_grouped=False):
-        """生成CAD命令"""
-        commands = []
-        
-        if not coordinates:
-            return "未找到有效的坐标数据"
-        
-        convert_type = self.convert_type.get()
-        # 暂时禁用文字标注功能
-        # add_text = self.add_text_var.get()
-        # text_height = self.text_height_var.get()
-        
-        # 检查是否包含Z坐标
-        has_z_coords = any(len(coord) > 2 and coord[2] != 0 for coord in coordinates)
-        
-        # 添加CAD命令说明
-        commands.append(f"# CAD命令 - {convert_type.upper()} 格式")
-        commands.append(f"# 共{len(coordinates)}个坐标点")
-        if has_z_coords:
-            commands.append("# 包含Z坐标 (3D)")
-        else:
-            commands.append("# 仅X,Y坐标 (2D)")
-        commands.append("")
-        
-        if convert_type == "pline":
-            # 生成多段线命令 - 改进格式
-            if has_z_coords:
-                # 3D多段线
-                commands.append("pline")
-                for x, y, z in coordinates:
-                    commands.append(f"{x},{y},{z}")
-                # 添加闭合选项（可选）
-                if len(coordinates) > 2:
-                    commands.append("C")  # 使用C终止多段线
-                else:
-                    commands.append("C^")  # 使用C^终止多段线
-            else:
-                # 2D多段线
-                commands.append("pline")
-                for x, y, z in coordinates:
-                    commands.append(f"{x},{y}")
-                # 添加闭合选项（可选）
-                if len(coordinates) > 2:
-                    commands.append("C")  # 使用C终止多段线
-                else:
-                    commands.append("C^")  # 使用C^终止多段线
-            
-        elif convert_type == "line":
-            # 生成直线命令 - 连接相邻点形成线段
-            # 如果是分组模式，确保每个组内的线段是独立的
-            for i in range(len(coordinates) - 1):
-                x1, y1, z1 = coordinates[i]
-                x2, y2, z2 = coordinates[i+1]
-                if has_z_coords:
-                    commands.append(f"line {x1},{y1},{z1} {x2},{y2},{z2}")
-                else:
-                    commands.append(f"line {x1},{y1} {x2},{y2}")
-            # 添加空行结束line命令组
-            if len(coordinates) > 1:
-                commands.append("")
-                
-        elif convert_type == "point":
-            # 生成点命令
-            for x, y, z in coordinates:
-                if has_z_coords:
-                    commands.append(f"point {x},{y},{z}")
-                else:
-                    commands.append(f"point {x},{y}")
-            # 添加空行结束point命令组
-            if coordinates:
-                commands.append("")
-        
-        # 暂时禁用文字标注功能
-        # # 添加文字标注
-        # if add_text:
-        #     commands.append("")  # 空行分隔
-        #     commands.append("# 文字标注")
-        #     for i, (x, y, z) in enumerate(coordinates, 1):
-        #         if has_z_coords:
-        #             commands.append(f'text j ml {x},{y},{z} {text_height} 0 "点{i}"')
-        #         else:
-        #             commands.append(f'text j ml {x},{y} {text_height} 0 "点{i}"')
-        #     # 添加空行结束text命令组
-        #     if coordinates:
-        #         commands.append("")
-        
-        return "\n".join(commands)
-    
-    def generate_grouped_cad_commands(self, groups):
-        """按分组生成CAD命令 - 确保每个组都是独立的闭合图形"""
-        commands = []
-        
-        for group_name, coordinates in groups.items():
-            if not coordinates:
-                continue
-                
-            commands.append(f"# {group_name}")
-            commands.append(f"# 共{len(coordinates)}个坐标点")
-            commands.append("")
-            
-            # 生成该组的CAD命令 - 传入is_grouped=True表示这是分组模式
-            group_commands = self.generate_cad_commands(coordinates, is_grouped=True)
-            commands.append(group_commands)
-            commands.append("")  # 空行分隔
-        
-        return "\n".join(commands)
+    def get_precision(self):
+        """当前选择的小数位数，完整精度时返回 None，输出原文时返回 SOURCE_PRECISION"""
+        value = self.precision_var.get()
+        if value == "完整":
+            return None
+        if value == "原文":
+            return SOURCE_PRECISION
+        return int(value)
+    
+    def get_text_format(self):
+        """当前选择的输出格式（TEXT_FORMATS 之一）"""
+        return TEXT_FORMAT_LABELS[self.text_format_var.get()]
     
     def plot_coordinates(self, coordinates):
-        """绘制坐标图形"""
+        """绘制坐标图形：在主线程选择视图，绘图和渲染在后台线程进行"""
         if not coordinates or not HAS_MATPLOTLIB:
             return
         
         try:
-            # 延迟导入 matplotlib 相关模块
-            import matplotlib
-            matplotlib.use('TkAgg')
-            import matplotlib.pyplot as plt
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            import numpy as np
-            
-            # 设置matplotlib中文字体
-            plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'DejaVu Sans']
-            plt.rcParams['axes.unicode_minus'] = False
-            # 禁用matplotlib的交互模式，减少进程创建
-            plt.ioff()
-            
-            # 清除之前的图形
-            for widget in self.graph_frame.winfo_children():
-                widget.destroy()
+            store = self.store
+            convert_type = self.convert_type.get()
             
             # 检查是否启用分组处理且有多个分组
             if (self.group_processing_var.get() and 
                 len(self.coordinate_groups) > 1 and 
                 any(len(coords) > 0 for coords in self.coordinate_groups.values())):
                 # 分组绘图
-                has_z_coords = any(len(coord) > 2 and coord[2] != 0 
-                                 for coords in self.coordinate_groups.values() 
-                                 for coord in coords)
-                if has_z_coords:
-                    self.plot_3d_grouped_coordinates()
+                if store.has_z():
+                    self.render_preview('3d', self.plot_3d_grouped_coordinates, (store, convert_type))
                 else:
-                    self.plot_2d_grouped_coordinates()
-            else:
-                # 普通绘图
-                # 限制显示的点数以提高性能
+                    self.render_preview('2d', self.plot_2d_grouped_coordinates, (store, convert_type))
+            elif has_z_coordinates(coordinates):
+                # 3D图形显示：限制显示的点数以提高性能
                 max_display_points = 1000
                 if len(coordinates) > max_display_points:
                     # 均匀采样
@@ -523,139 +811,185 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
                     self.update_status(f"⚠️ 坐标点过多，图形预览仅显示{len(display_coordinates)}个采样点", '#ffc107')
                 else:
                     display_coordinates = coordinates
-                
-                # 检查是否包含Z坐标
-                has_z_coords = any(len(coord) > 2 and coord[2] != 0 for coord in display_coordinates)
-                
-                if has_z_coords:
-                    # 3D图形显示
-                    self.plot_3d_coordinates(display_coordinates)
-                else:
-                    # 2D图形显示
-                    self.plot_2d_coordinates(display_coordinates)
+                self.render_preview('3d', self.plot_3d_coordinates, (display_coordinates, convert_type))
+            else:
+                # 2D图形显示：按画布分辨率抽稀
+                self.render_preview('2d', self.plot_2d_coordinates, (coordinates, convert_type))
             
         except Exception as e:
-            # 如果图形绘制失败，显示错误信息
-            error_label = tk.Label(self.graph_frame, 
-                text=f"图形预览失败:\n{str(e)}\n\n请检查matplotlib安装",
-                font=('Microsoft YaHei', 10), fg='#dc3545', bg='white')
-            error_label.pack(expand=True)
+            self.show_preview_error(e)
     
-    def plot_2d_coordinates(self, coordinates):
-        """绘制2D坐标图形"""
-        # 清理旧的图形
-        self.cleanup_matplotlib()
-        
-        # 创建图形并设置中文字体
-        fig, ax = plt.subplots(figsize=(10, 7))
-        
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
-        
-        # 提取X和Y坐标
-        x_coords = [coord[0] for coord in coordinates]
-        y_coords = [coord[1] for coord in coordinates]
-        
-        # 绘制图形
-        convert_type = self.convert_type.get()
+    def show_preview_error(self, e):
+        """图形绘制失败时显示错误信息"""
+        self.clear_preview()
+        error_label = tk.Label(self.graph_frame, 
+            text=f"图形预览失败:\n{str(e)}\n\n请检查matplotlib安装",
+            font=('Microsoft YaHei', 10), fg='#dc3545', bg='white')
+        error_label.pack(expand=True)
+    
+    def render_preview(self, kind, plot, args):
+        """在后台线程调用 plot(视图, *args) 更新图形并用 Agg 渲染到 RGBA 缓冲区，完成后在主线程显示
+
+        渲染期间图形区域显示占位提示，CAD命令、复制和保存不需要等待预览。
+        上一次渲染尚未结束时，本次请求在其结束后再开始，避免两个线程同时修改同一个图形。
+        """
+        self.preview_generation += 1
+        self.show_preview_placeholder()
+        if self.preview_rendering:
+            self.preview_request = (self.preview_generation, kind, plot, args)
+            return
         
-        if convert_type == "pline":
-            # 绘制多段线
-            ax.plot(x_coords, y_coords, 'b-', linewidth=2, label='多段线')
-            ax.plot(x_coords, y_coords, 'ro', markersize=4, label='坐标点')
-            
-        elif convert_type == "line":
-            # 绘制直线段
-            for i in range(len(coordinates) - 1):
-                x1, y1 = coordinates[i][0], coordinates[i][1]
-                x2, y2 = coordinates[i+1][0], coordinates[i+1][1]
-                ax.plot([x1, x2], [y1, y2], 'b-', linewidth=1)
-            ax.plot(x_coords, y_coords, 'ro', markersize=4, label='坐标点')
-            
-        elif convert_type == "point":
-            # 绘制点
-            ax.plot(x_coords, y_coords, 'ro', markersize=6, label='坐标点')
+        generation = self.preview_generation
+        self.clear_preview()
+        view = self.show_preview_view(kind)
+        self.show_preview_placeholder()
+        view.busy = True
+        self.preview_rendering = True
+        
+        def task():
+            # 绘图和渲染期间一直持有画布的锁，主线程的重绘和窗口大小变化推迟到完成后进行
+            with view.canvas.render_lock:
+                message = plot(view, *args)
+                view.canvas.render()
+            return message
+        
+        def on_done(message=None, error=None):
+            view.busy = False
+            self.preview_rendering = False
+            # 清空工具栏的视图历史，“主页”、“后退”回到新图形的显示范围而不是上一个文件的
+            view.toolbar.update()
+            request, self.preview_request = self.preview_request, None
+            if request is not None and request[0] == self.preview_generation:
+                # 渲染期间又有新的预览请求，直接开始最新的一个
+                self.render_preview(*request[1:])
+            elif generation == self.preview_generation:
+                self.hide_preview_placeholder()
+                if error is not None:
+                    self.show_preview_error(error)
+                else:
+                    view.canvas.show()
+                    if message:
+                        self.update_status(message, '#007bff')
         
-        # 设置等比例尺
+        self.run_background_task(task, on_done, lambda e: on_done(error=e))
+    
+    def show_preview_placeholder(self):
+        """在图形区域上方显示占位提示"""
+        if self.preview_placeholder is None:
+            self.preview_placeholder = tk.Label(self.graph_frame, text="正在生成图形预览...",
+                                                font=('Microsoft YaHei', 12), fg='#6c757d', bg='white')
+        self.preview_placeholder.place(relx=0, rely=0, relwidth=1, relheight=1)
+        self.preview_placeholder.lift()
+    
+    def hide_preview_placeholder(self):
+        if self.preview_placeholder is not None:
+            self.preview_placeholder.place_forget()
+    
+    def clear_preview(self):
+        """隐藏图形预览视图（保留以便下次复用）和占位提示，删除其他提示控件"""
+        keep = [view.widget for view in self.preview_views.values()]
+        for widget in self.graph_frame.winfo_children():
+            if widget in keep:
+                widget.pack_forget()
+            elif widget is not self.preview_placeholder:
+                widget.destroy()
+        self.hide_preview_placeholder()
+    
+    def show_preview_view(self, kind):
+        """显示 '2d' 或 '3d' 预览视图；视图在第一次使用时创建，之后一直复用"""
+        view = self.preview_views.get(kind)
+        if view is None:
+            if kind == '3d':
+                view = PreviewView(self.graph_frame, (12, 8), projection='3d')
+            else:
+                view = PreviewView(self.graph_frame, (10, 7))
+            self.preview_views[kind] = view
+        view.widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        return view
+    
+    def set_2d_limits(self, ax, bounds):
+        """按坐标范围设置2D显示范围，两端各留10%的边距（至少为1）"""
+        x_min, x_max, y_min, y_max = bounds
+        x_margin = max((x_max - x_min) * 0.1, 1)
+        y_margin = max((y_max - y_min) * 0.1, 1)
+        ax.set_xlim(x_min - x_margin, x_max + x_margin)
+        ax.set_ylim(y_min - y_margin, y_max + y_margin)
+    
+    def plot_2d_coordinates(self, view, coordinates, convert_type):
+        """绘制2D坐标图形（在后台线程调用），返回要显示的状态信息"""
+        view.begin()
+        ax = view.ax
+        
+        # 设置等比例尺和显示范围
+        points = as_points(coordinates)
+        bounds = data_bounds(points)
         ax.set_aspect('equal')
+        self.set_2d_limits(ax, bounds)
         
-        # 计算坐标范围并设置合适的显示范围
-        x_min, x_max = min(x_coords), max(x_coords)
-        y_min, y_max = min(y_coords), max(y_coords)
-        
-        # 添加边距，确保图形不会太贴近边缘
-        x_margin = (x_max - x_min) * 0.1
-        y_margin = (y_max - y_min) * 0.1
-        
-        # 如果边距太小，设置最小边距
-        if x_margin < 1:
-            x_margin = 1
-        if y_margin < 1:
-            y_margin = 1
+        def draw(display_points):
+            """绘制图形：各图形元素按名称复用，只更新坐标和样式"""
+            xy = (display_points[:, 0], display_points[:, 1])
+            if convert_type == "pline":
+                # 绘制多段线
+                view.line('line', xy, label='多段线', color='b', linestyle='-', linewidth=2, marker='None')
+                view.line('points', xy, label='坐标点', color='r', linestyle='None', marker='o', markersize=4)
+                
+            elif convert_type == "line":
+                # 绘制直线段：全部线段作为一个 LineCollection 绘制
+                view.segments('segments', line_segments(display_points), color='b', linewidth=1)
+                view.line('points', xy, label='坐标点', color='r', linestyle='None', marker='o', markersize=4)
+                
+            elif convert_type == "point":
+                # 绘制点
+                view.line('points', xy, label='坐标点', color='r', linestyle='None', marker='o', markersize=6)
         
-        ax.set_xlim(x_min - x_margin, x_max + x_margin)
-        ax.set_ylim(y_min - y_margin, y_max + y_margin)
+        # 建立多分辨率金字塔，按可见范围和画布分辨率抽稀后绘制；缩放或平移后自动重新抽稀
+        shown = view.set_layers([(PreviewPyramid(points, convert_type, bounds), draw, None)])
+        message = f"图形预览按画布分辨率显示{shown}个点" if shown < len(points) else None
         
         # 设置图形属性
         ax.set_xlabel('X坐标', fontsize=12)
         ax.set_ylabel('Y坐标', fontsize=12)
         ax.set_title(f'坐标图形预览 ({len(coordinates)}个点) - 2D视图', fontsize=14, fontweight='bold')
         ax.grid(True, alpha=0.3)
-        ax.legend()
         
         # 添加坐标点标注（限制数量避免过于拥挤）
         max_annotations = min(20, len(coordinates))
         step = max(1, len(coordinates) // max_annotations)
         for i in range(0, len(coordinates), step):
-            x, y = coordinates[i][0], coordinates[i][1]
+            x, y = points[i][0], points[i][1]
             ax.annotate(f'点{i+1}', (x, y), xytext=(5, 5), 
                        textcoords='offset points', fontsize=8)
         
-        # 嵌入到tkinter窗口
-        canvas = FigureCanvasTkAgg(fig, self.graph_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-    
-
+        view.finish()
+        return message
     
-    def plot_3d_coordinates(self, coordinates):
-        """绘制3D坐标图形"""
-        # 清理旧的图形
-        self.cleanup_matplotlib()
-        
-        # 创建3D图形
-        fig = plt.figure(figsize=(12, 8))
-        ax = fig.add_subplot(111, projection='3d')
-        
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+    def plot_3d_coordinates(self, view, coordinates, convert_type):
+        """绘制3D坐标图形（在后台线程调用）"""
+        view.begin()
+        ax = view.ax
         
         # 提取X、Y、Z坐标
-        x_coords = [coord[0] for coord in coordinates]
-        y_coords = [coord[1] for coord in coordinates]
-        z_coords = [coord[2] for coord in coordinates]
+        points = as_points(coordinates)
+        xyz = (points[:, 0], points[:, 1], points[:, 2])
         
         # 绘制图形
-        convert_type = self.convert_type.get()
-        
         if convert_type == "pline":
             # 绘制3D多段线
-            ax.plot(x_coords, y_coords, z_coords, 'b-', linewidth=2, label='3D多段线')
-            ax.scatter(x_coords, y_coords, z_coords, c='red', s=50, label='坐标点')
+            view.line('line', xyz, label='3D多段线', color='b', linestyle='-', linewidth=2, marker='None')
+            view.line('points', xyz, label='坐标点', color='red', linestyle='None', marker='o', markersize=7)
             
         elif convert_type == "line":
-            # 绘制3D直线段
-            for i in range(len(coordinates) - 1):
-                x1, y1, z1 = coordinates[i]
-                x2, y2, z2 = coordinates[i+1]
-                ax.plot([x1, x2], [y1, y2], [z1, z2], 'b-', linewidth=1)
-            ax.scatter(x_coords, y_coords, z_coords, c='red', s=50, label='坐标点')
+            # 绘制3D直线段：全部线段作为一个 Line3DCollection 绘制
+            view.segments('segments', line_segments(points, 3), color='b', linewidth=1)
+            view.line('points', xyz, label='坐标点', color='red', linestyle='None', marker='o', markersize=7)
             
         elif convert_type == "point":
             # 绘制3D点
-            ax.scatter(x_coords, y_coords, z_coords, c='red', s=100, label='坐标点')
+            view.line('points', xyz, label='坐标点', color='red', linestyle='None', marker='o', markersize=10)
+        
+        # 原地更新的数据不会自动调整显示范围，按本次的坐标重新计算
+        ax.auto_scale_xyz(*xyz, had_data=False)
         
         # 设置坐标轴标签
         ax.set_xlabel('X坐标', fontsize=12)
@@ -665,9 +999,6 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
         # 设置标题
         ax.set_title(f'3D坐标图形预览 ({len(coordinates)}个点)', fontsize=14, fontweight='bold')
         
-        # 添加图例
-        ax.legend()
-        
         # 添加坐标点标注（限制数量避免过于拥挤）
         max_annotations = min(15, len(coordinates))
         step = max(1, len(coordinates) // max_annotations)
@@ -678,135 +1009,83 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
         # 设置视角
         ax.view_init(elev=20, azim=45)
         
-        # 嵌入到tkinter窗口
-        canvas = FigureCanvasTkAgg(fig, self.graph_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        view.finish()
     
-    def plot_2d_grouped_coordinates(self):
-        """绘制2D分组坐标图形"""
-        # 清理旧的图形
-        self.cleanup_matplotlib()
-        
-        # 创建图形并设置中文字体
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+    def plot_2d_grouped_coordinates(self, view, store, convert_type):
+        """绘制2D分组坐标图形（在后台线程调用）"""
+        view.begin()
+        ax = view.ax
         
         # 定义颜色列表
         colors = ['red', 'blue', 'green', 'orange', 'purple', 'brown', 'pink', 'gray', 'olive', 'cyan']
         
-        # 收集所有坐标用于计算范围
-        all_x = []
-        all_y = []
+        # 所有分组共用同一显示范围；折线抽稀的点数上限按各分组的点数分配
+        group_points = [(name, store.group_points(name)) for name in store.group_names]
+        bounds = merge_bounds([data_bounds(points) for _, points in group_points])
+        total = len(store)
+        budget = line_budget(view.canvas_size())
         
-        # 绘制每个分组
-        for i, (group_name, coordinates) in enumerate(self.coordinate_groups.items()):
+        # 设置等比例尺和显示范围
+        ax.set_aspect('equal')
+        if bounds is not None:
+            self.set_2d_limits(ax, bounds)
+        
+        def group_drawer(i, label, color):
+            """返回绘制第 i 个分组的函数：各图形元素按名称复用，只更新坐标和样式"""
+            def draw(display_coordinates):
+                xy = (display_coordinates[:, 0], display_coordinates[:, 1])
+                if convert_type == "pline":
+                    # 绘制多段线
+                    view.line(('line', i), xy, label=label, color=color, linestyle='-', linewidth=2, marker='None')
+                    view.line(('points', i), xy, color=color, linestyle='None', marker='o', markersize=4)
+                    
+                elif convert_type == "line":
+                    # 绘制直线段：每个分组的线段作为一个 LineCollection 绘制
+                    view.segments(('segments', i), line_segments(display_coordinates), color=color, linewidth=1)
+                    view.line(('points', i), xy, label=label, color=color, linestyle='None', marker='o', markersize=4)
+                    
+                elif convert_type == "point":
+                    # 绘制点
+                    view.line(('points', i), xy, label=label, color=color, linestyle='None', marker='o', markersize=6)
+            return draw
+        
+        # 每个分组建立多分辨率金字塔，按可见范围和画布分辨率抽稀后绘制；缩放或平移后自动重新抽稀
+        layers = []
+        for i, (group_name, coordinates) in enumerate(group_points):
             if len(coordinates) == 0:
                 continue
-                
             color = colors[i % len(colors)]
-            
-            # 限制显示的点数以提高性能
-            max_display_points = 500
-            if len(coordinates) > max_display_points:
-                step = len(coordinates) // max_display_points
-                display_coordinates = coordinates[::step]
-            else:
-                display_coordinates = coordinates
-            
-            # 提取X和Y坐标
-            x_coords = [coord[0] for coord in display_coordinates]
-            y_coords = [coord[1] for coord in display_coordinates]
-            
-            all_x.extend(x_coords)
-            all_y.extend(y_coords)
-            
-            # 绘制图形
-            convert_type = self.convert_type.get()
-            
-            if convert_type == "pline":
-                # 绘制多段线
-                ax.plot(x_coords, y_coords, color=color, linewidth=2, 
-                       label=f'{group_name} ({len(coordinates)}个点)')
-                ax.plot(x_coords, y_coords, color=color, marker='o', 
-                       markersize=4, linestyle='')
-                
-            elif convert_type == "line":
-                # 绘制直线段
-                for j in range(len(display_coordinates) - 1):
-                    x1, y1 = display_coordinates[j][0], display_coordinates[j][1]
-                    x2, y2 = display_coordinates[j+1][0], display_coordinates[j+1][1]
-                    ax.plot([x1, x2], [y1, y2], color=color, linewidth=1)
-                ax.plot(x_coords, y_coords, color=color, marker='o', 
-                       markersize=4, linestyle='', label=f'{group_name} ({len(coordinates)}个点)')
-                
-            elif convert_type == "point":
-                # 绘制点
-                ax.plot(x_coords, y_coords, color=color, marker='o', 
-                       markersize=6, linestyle='', label=f'{group_name} ({len(coordinates)}个点)')
-        
-        # 设置等比例尺
-        ax.set_aspect('equal')
-        
-        # 计算坐标范围并设置合适的显示范围
-        if all_x and all_y:
-            x_min, x_max = min(all_x), max(all_x)
-            y_min, y_max = min(all_y), max(all_y)
-            
-            # 添加边距
-            x_margin = (x_max - x_min) * 0.1
-            y_margin = (y_max - y_min) * 0.1
-            
-            if x_margin < 1:
-                x_margin = 1
-            if y_margin < 1:
-                y_margin = 1
-            
-            ax.set_xlim(x_min - x_margin, x_max + x_margin)
-            ax.set_ylim(y_min - y_margin, y_max + y_margin)
+            label = f'{group_name} ({len(coordinates)}个点)'
+            layers.append((PreviewPyramid(coordinates, convert_type), group_drawer(i, label, color),
+                           max(budget * len(coordinates) // total, 6)))
+        view.set_layers(layers)
         
         # 设置图形属性
         ax.set_xlabel('X坐标', fontsize=12)
         ax.set_ylabel('Y坐标', fontsize=12)
         ax.set_title(f'分组坐标图形预览 - 2D视图', fontsize=14, fontweight='bold')
         ax.grid(True, alpha=0.3)
-        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
         
-        # 嵌入到tkinter窗口
-        canvas = FigureCanvasTkAgg(fig, self.graph_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        view.finish(bbox_to_anchor=(1.05, 1), loc='upper left')
     
-    def plot_3d_grouped_coordinates(self):
-        """绘制3D分组坐标图形"""
-        # 清理旧的图形
-        self.cleanup_matplotlib()
-        
-        # 创建3D图形
-        fig = plt.figure(figsize=(14, 10))
-        ax = fig.add_subplot(111, projection='3d')
-        
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+    def plot_3d_grouped_coordinates(self, view, store, convert_type):
+        """绘制3D分组坐标图形（在后台线程调用）"""
+        view.begin()
+        ax = view.ax
         
         # 定义颜色列表
         colors = ['red', 'blue', 'green', 'orange', 'purple', 'brown', 'pink', 'gray', 'olive', 'cyan']
         
-        # 收集所有坐标用于计算范围
-        all_x = []
-        all_y = []
-        all_z = []
+        # 收集所有显示的坐标用于计算范围
+        all_points = []
         
         # 绘制每个分组
-        for i, (group_name, coordinates) in enumerate(self.coordinate_groups.items()):
+        for i, (group_name, coordinates) in enumerate(store.groups.items()):
             if len(coordinates) == 0:
                 continue
                 
             color = colors[i % len(colors)]
+            label = f'{group_name} ({len(coordinates)}个点)'
             
             # 限制显示的点数以提高性能
             max_display_points = 500
@@ -817,36 +1096,29 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
                 display_coordinates = coordinates
             
             # 提取X、Y、Z坐标
-            x_coords = [coord[0] for coord in display_coordinates]
-            y_coords = [coord[1] for coord in display_coordinates]
-            z_coords = [coord[2] for coord in display_coordinates]
-            
-            all_x.extend(x_coords)
-            all_y.extend(y_coords)
-            all_z.extend(z_coords)
+            points = as_points(display_coordinates)
+            all_points.append(points)
+            xyz = (points[:, 0], points[:, 1], points[:, 2])
             
             # 绘制图形
-            convert_type = self.convert_type.get()
-            
             if convert_type == "pline":
                 # 绘制3D多段线
-                ax.plot(x_coords, y_coords, z_coords, color=color, linewidth=2, 
-                       label=f'{group_name} ({len(coordinates)}个点)')
-                ax.scatter(x_coords, y_coords, z_coords, c=color, s=50)
+                view.line(('line', i), xyz, label=label, color=color, linestyle='-', linewidth=2, marker='None')
+                view.line(('points', i), xyz, color=color, linestyle='None', marker='o', markersize=7)
                 
             elif convert_type == "line":
-                # 绘制3D直线段
-                for j in range(len(display_coordinates) - 1):
-                    x1, y1, z1 = display_coordinates[j]
-                    x2, y2, z2 = display_coordinates[j+1]
-                    ax.plot([x1, x2], [y1, y2], [z1, z2], color=color, linewidth=1)
-                ax.scatter(x_coords, y_coords, z_coords, c=color, s=50, 
-                          label=f'{group_name} ({len(coordinates)}个点)')
+                # 绘制3D直线段：每个分组的线段作为一个 Line3DCollection 绘制
+                view.segments(('segments', i), line_segments(points, 3), color=color, linewidth=1)
+                view.line(('points', i), xyz, label=label, color=color, linestyle='None', marker='o', markersize=7)
                 
             elif convert_type == "point":
                 # 绘制3D点
-                ax.scatter(x_coords, y_coords, z_coords, c=color, s=100, 
-                          label=f'{group_name} ({len(coordinates)}个点)')
+                view.line(('points', i), xyz, label=label, color=color, linestyle='None', marker='o', markersize=10)
+        
+        # 原地更新的数据不会自动调整显示范围，按本次的坐标重新计算
+        if all_points:
+            points = np.concatenate(all_points)
+            ax.auto_scale_xyz(points[:, 0], points[:, 1], points[:, 2], had_data=False)
         
         # 设置坐标轴标签
         ax.set_xlabel('X坐标', fontsize=12)
@@ -856,16 +1128,11 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
         # 设置标题
         ax.set_title(f'分组3D坐标图形预览', fontsize=14, fontweight='bold')
         
-        # 添加图例
-        ax.legend(bbox_to_anchor=(1.15, 1), loc='upper left')
-        
         # 设置视角
         ax.view_init(elev=20, azim=45)
         
-        # 嵌入到tkinter窗口
-        canvas = FigureCanvasTkAgg(fig, self.graph_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        # 添加图例并重绘
+        view.finish(bbox_to_anchor=(1.15, 1), loc='upper left')
     
     def update_status(self, message, color='#6c757d'):
         """更新状态栏信息"""
@@ -877,152 +1144,209 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
         self.update_status("就绪", '#6c757d')
     
     def convert_coordinates(self):
-        """执行坐标转换"""
-        if not self.file_path_var.get():
+        """执行坐标转换：解析和生成在后台线程进行，界面通过队列接收进度"""
+        if self.converting:
+            # 已有转换在进行中
+            return
+        
+        file_path = self.file_path_var.get()
+        if not file_path:
             messagebox.showwarning("警告", "请先选择坐标文件")
             return
         
+        sidecar = self.sidecar_var.get()
         try:
-            self.update_status("正在读取文件...", '#007bff')
-            self.root.update()  # 强制更新界面
-            
             # 添加文件大小检查
-            file_size = os.path.getsize(self.file_path_var.get())
-            if file_size > 10 * 1024 * 1024:  # 10MB
-                if not messagebox.askyesno("文件过大", 
-                    f"文件大小({file_size/1024/1024:.1f}MB)较大，处理可能需要较长时间。\n是否继续？"):
-                    return
-            
-            # 改进的文件读取方式 - 流式处理
-            coordinates = []
-            groups = {}
-            current_group = "默认组"
-            line_count = 0
-            valid_coords = 0
-            
-            # 编译正则表达式
-            coord_pattern = re.compile(r'^\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)\s*,\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)\s*,?\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)?\s*$')
+            file_size = os.path.getsize(file_path)
+            # 文件未修改时直接使用上次的解析结果，只重新生成命令
+            cached = get_cached_store(file_path, keep_text=self.get_precision() == SOURCE_PRECISION,
+                                      sidecar=sidecar) is not None
+        except OSError as e:
+            messagebox.showerror("错误", f"无法读取文件: {str(e)}")
+            return
+        if file_size > 10 * 1024 * 1024 and not cached:  # 10MB
+            if not messagebox.askyesno("文件过大", 
+                f"文件大小({file_size/1024/1024:.1f}MB)较大，处理可能需要较长时间。\n是否继续？"):
+                return
+        
+        if sidecar and not cached and uses_sidecar(self.store, file_path):
+            # 重新解析后会改写当前结果所映射的缓存文件，先释放当前结果（Windows 下映射打开着的文件不能被替换）
+            self.clear_results()
+        
+        # 在主线程读取界面选项，后台线程不访问任何Tk对象
+        convert_type = self.convert_type.get()
+        grouped = self.group_processing_var.get()
+        precision = self.get_precision()
+        text_format = self.get_text_format()
+        
+        self.cancel_event = threading.Event()
+        self.conversion_queue = queue.Queue()
+        self.conversion_thread = threading.Thread(
+            target=self.run_conversion_worker,
+            args=(file_path, file_size, convert_type, grouped, precision, text_format, sidecar,
+                  self.cancel_event, self.conversion_queue),
+            daemon=True)
+        
+        self.cancel_group_indexing()
+        self.set_converting(True)
+        self.update_status("正在生成CAD命令..." if cached else "正在读取文件...", '#007bff')
+        self.conversion_thread.start()
+        self.root.after(WORKER_POLL_INTERVAL, self.poll_conversion_queue)
+    
+    def run_conversion_worker(self, file_path, file_size, convert_type, grouped, precision, text_format, sidecar,
+                              cancel_event, messages):
+        """后台线程：解析坐标并生成CAD命令，结果和进度通过 messages 队列发回主线程"""
+        try:
+            def report_progress(bytes_read, line_count, valid_coords):
+                messages.put(('progress', "正在解析坐标数据", bytes_read, file_size,
+                              f"已处理{line_count}行，找到{valid_coords}个有效坐标"))
             
-            with open(self.file_path_var.get(), 'r', encoding='utf-8') as f:
-                for line in f:
-                    line_count += 1
-                    line = line.strip()
-                    
-                    # 每处理1000行更新一次状态
-                    if line_count % 1000 == 0:
-                        self.update_status(f"正在解析坐标数据... (已处理{line_count}行，找到{valid_coords}个有效坐标)", '#007bff')
-                        self.root.update()
-                    
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    # 检查是否是分组标识
-                    if line.startswith('第') and '组' in line:
-                        current_group = line
-                        if current_group not in groups:
-                            groups[current_group] = []
-                        continue
-                    
-                    # 匹配坐标格式
-                    match = coord_pattern.match(line)
-                    if match:
-                        try:
-                            x, y, z = match.group(1), match.group(2), match.group(3) if match.group(3) else "0"
-                            coord = (float(x), float(y), float(z))
-                            
-                            # 验证坐标值的合理性
-                            if abs(coord[0]) > 1e10 or abs(coord[1]) > 1e10 or abs(coord[2]) > 1e10:
-                                continue
-                            
-                            # 检查是否启用分组处理
-                            if self.group_processing_var.get() and len(groups) > 1:
-                                # 分组模式：只添加到分组中，不添加到合并列表
-                                if current_group not in groups:
-                                    groups[current_group] = []
-                                groups[current_group].append(coord)
-                                valid_coords += 1
-                            else:
-                                # 非分组模式：添加到合并列表和分组中
-                                coordinates.append(coord)
-                                if current_group not in groups:
-                                    groups[current_group] = []
-                                groups[current_group].append(coord)
-                                valid_coords += 1
-                        except ValueError:
-                            continue
+            store = parse_coordinate_file_cached(file_path, progress=report_progress, cancel_event=cancel_event,
+                                                 keep_text=precision == SOURCE_PRECISION, sidecar=sidecar)
+            if not len(store):
+                messages.put(('empty',))
+                return
             
-            self.coordinates = coordinates
-            self.coordinate_groups = groups
+            messages.put(('progress', "正在生成CAD命令", 0, 0, f"共{len(store)}个有效坐标点"))
             
-            # 提供详细的解析结果反馈
-            if valid_coords == 0:
-                messagebox.showwarning("警告", "文件中未找到有效的坐标数据\n请检查文件格式是否正确")
-                self.update_status("就绪", '#6c757d')
-                return
-            elif valid_coords < len(coordinates):
-                messagebox.showinfo("信息", f"解析完成：共处理{line_count}行，找到{valid_coords}个有效坐标点")
+            def report_output(size, line_count):
+                messages.put(('progress', "正在生成CAD命令", 0, 0,
+                              f"共{len(store)}个有效坐标点，已生成{line_count}行"))
             
-            self.update_status(f"解析完成：共{valid_coords}个有效坐标点", '#28a745')
+            # 根据用户选择决定是否按分组处理；命令写入磁盘缓存而不是拼接成一个字符串
+            output = CommandOutput()
+            try:
+                output.write(iter_conversion_commands(store, convert_type, grouped, cancel_event,
+                                                      on_group=output.mark_group, precision=precision,
+                                                      text_format=text_format),
+                             cancel_event, report_output)
+                check_cancelled(cancel_event)
+            except BaseException:
+                output.close()
+                raise
             
-            # 检查是否启用分组处理
-            if self.group_processing_var.get() and len(self.coordinate_groups) > 1:
-                # 分组模式：检查分组数据
-                total_group_coords = sum(len(coords) for coords in self.coordinate_groups.values())
-                if total_group_coords == 0:
-                    messagebox.showwarning("警告", "文件中未找到有效的坐标数据")
-                    self.update_status("就绪", '#6c757d')
-                    return
+            messages.put(('done', store, output, (convert_type, grouped, precision, text_format)))
+        except ConversionCancelled:
+            messages.put(('cancelled',))
+        except Exception as e:
+            messages.put(('error', str(e)))
+    
+    def poll_conversion_queue(self):
+        """主线程定时读取后台转换队列"""
+        try:
+            while True:
+                message = self.conversion_queue.get_nowait()
+                kind = message[0]
                 
-                # 添加坐标数量检查
-                if total_group_coords > 10000:
-                    if not messagebox.askyesno("坐标数量过多", 
-                        f"检测到{total_group_coords}个坐标点，处理可能需要较长时间。\n是否继续？"):
-                        return
-            else:
-                # 非分组模式：检查合并的coordinates
-                if not self.coordinates:
-                    messagebox.showwarning("警告", "文件中未找到有效的坐标数据")
-                    self.update_status("就绪", '#6c757d')
-                    return
+                if kind == 'progress':
+                    self.show_conversion_progress(*message[1:])
+                    continue
                 
-                # 添加坐标数量检查
-                if len(self.coordinates) > 10000:
-                    if not messagebox.askyesno("坐标数量过多", 
-                        f"检测到{len(self.coordinates)}个坐标点，处理可能需要较长时间。\n是否继续？"):
-                        return
-            
-            self.update_status("正在生成CAD命令...", '#007bff')
-            self.root.update()  # 强制更新界面
-            
-            # 根据用户选择决定是否按分组处理
-            if self.group_processing_var.get() and len(self.coordinate_groups) > 1:
-                # 分组处理 - 使用分组数据，不使用合并的coordinates
-                cad_commands = self.generate_grouped_cad_commands(self.coordinate_groups)
-            else:
-                # 非分组处理 - 使用合并的coordinates
-                cad_commands = self.generate_cad_commands(self.coordinates)
-            
+                # 其余消息表示后台线程已结束
+                self.conversion_thread = None
+                if kind == 'done':
+                    self.on_conversion_done(*message[1:])
+                elif kind == 'empty':
+                    self.set_converting(False)
+                    messagebox.showwarning("警告", "文件中未找到有效的坐标数据\n请检查文件格式是否正确")
+                    self.reset_status()
+                elif kind == 'cancelled':
+                    self.on_conversion_cancelled()
+                elif kind == 'error':
+                    self.set_converting(False)
+                    messagebox.showerror("错误", f"转换过程中出现错误: {message[1]}")
+                    self.update_status("转换失败", '#dc3545')
+                    # 3秒后恢复默认状态
+                    self.root.after(3000, self.reset_status)
+                return
+        except queue.Empty:
+            pass
+        
+        self.root.after(WORKER_POLL_INTERVAL, self.poll_conversion_queue)
+    
+    def show_conversion_progress(self, stage, done, total, detail):
+        """显示转换进度；total 为0时进度条显示为忙碌状态"""
+        if total:
+            percent = min(100, done * 100 // total)
+            if str(self.progress_bar['mode']) != 'determinate':
+                self.progress_bar.stop()
+                self.progress_bar.config(mode='determinate')
+            self.progress_bar['value'] = percent
+            self.update_status(f"{stage}... {percent}% ({detail})", '#007bff')
+        else:
+            if str(self.progress_bar['mode']) != 'indeterminate':
+                self.progress_bar.config(mode='indeterminate')
+                self.progress_bar.start(20)
+            self.update_status(f"{stage}... ({detail})", '#007bff')
+    
+    def set_converting(self, converting):
+        """切换转换中/空闲状态下的按钮和进度条"""
+        self.converting = converting
+        self.convert_btn.config(state=tk.DISABLED if converting else tk.NORMAL)
+        self.cancel_btn.config(state=tk.NORMAL if converting else tk.DISABLED)
+        self.progress_bar.stop()
+        self.progress_bar.config(mode='determinate')
+        self.progress_bar['value'] = 0
+    
+    def cancel_conversion(self):
+        """请求取消正在进行的转换"""
+        if not self.converting or self.cancel_event.is_set():
+            return
+        self.cancel_event.set()
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.update_status("正在取消...", '#ffc107')
+    
+    def on_conversion_cancelled(self):
+        """转换取消后恢复界面"""
+        self.set_converting(False)
+        self.update_status("转换已取消", '#ffc107')
+        self.root.after(3000, self.reset_status)
+    
+    def on_conversion_done(self, store, output, result_options):
+        """后台生成完成后在主线程显示结果"""
+        if self.cancel_event.is_set():
+            # 生成完成后才收到取消请求，同样不显示结果
+            output.close()
+            self.on_conversion_cancelled()
+            return
+        
+        self.set_store(store)
+        self.result_options = result_options
+        self.set_command_output(output)
+        self.on_render_done()
+    
+    def set_command_output(self, output):
+        """替换当前的命令输出缓存并刷新查看器；分组复制对话框针对的是旧结果，一并关闭"""
+        self.close_group_copy_dialog()
+        if self.command_output is not None:
+            self.command_output.close()
+        self.command_output = output
+        self.cad_viewer.set_output(output)
+    
+    def get_cad_text(self):
+        """读取全部CAD命令文本（用于复制到剪贴板）"""
+        if self.command_output is None:
+            return ""
+        return self.command_output.read_text().strip()
+    
+    def on_render_done(self):
+        """结果显示完成后开始绘制预览并自动复制"""
+        self.set_converting(False)
+        
+        try:
             # 检查Z坐标并更新状态
-            has_z_coords = any(len(coord) > 2 and coord[2] != 0 for coord in self.coordinates)
-            if has_z_coords:
+            if self.store.has_z():
                 self.update_status(f"✅ 转换完成！共{len(self.coordinates)}个点 (包含Z坐标)", '#28a745')
             else:
                 self.update_status(f"✅ 转换完成！共{len(self.coordinates)}个点", '#28a745')
             
-            # 显示结果
-            self.cad_text.delete(1.0, tk.END)
-            self.cad_text.insert(1.0, cad_commands)
-            
-            # 绘制图形预览
+            # 在后台绘制图形预览，复制和保存不等待预览完成
             if HAS_MATPLOTLIB:
-                self.update_status("正在生成图形预览...", '#007bff')
-                self.root.update()  # 强制更新界面
                 self.plot_coordinates(self.coordinates)
             
             # 自动复制功能
             if self.auto_copy_var.get():
                 self.update_status("正在复制到剪贴板...", '#007bff')
-                self.root.update()  # 强制更新界面
                 self.copy_to_cad()
                 self.update_status(f"✅ 转换完成！共处理 {len(self.coordinates)} 个坐标点，已自动复制", '#28a745')
             else:
@@ -1039,8 +1363,7 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
     
     def copy_to_cad(self):
         """一键复制到CAD - 增强版复制功能"""
-        content = self.cad_text.get(1.0, tk.END).strip()
-        if not content:
+        if self.command_output is None or not self.command_output.size:
             messagebox.showwarning("警告", "没有可复制的内容")
             return
         
@@ -1051,9 +1374,126 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
             
             # 显示分组复制选择对话框
             self.show_group_copy_dialog()
+        elif self.command_output.size > CLIPBOARD_CHUNK_THRESHOLD:
+            # 内容太大，一次写入剪贴板会长时间卡住界面，改为分段复制
+            self.show_chunked_copy_dialog()
         else:
             # 普通复制
-            self.copy_content_to_clipboard(content)
+            self.copy_content_to_clipboard(self.get_cad_text())
+    
+    def show_chunked_copy_dialog(self):
+        """分段复制面板：按大小上限把命令切分为若干段（在分组或命令边界处），逐段复制到剪贴板"""
+        if self.command_output is None or not self.command_output.size or self.converting:
+            messagebox.showwarning("警告", "没有可复制的内容")
+            return
+        
+        output = self.command_output
+        dialog = tk.Toplevel(self.root)
+        dialog.title("分段复制")
+        dialog.geometry("560x420")
+        dialog.transient(self.root)
+        
+        # 面板打开期间一直复制打开时的结果，新的转换或清空结果不会关闭它
+        output.acquire()
+        
+        def close_dialog():
+            output.release()
+            dialog.destroy()
+        
+        dialog.protocol("WM_DELETE_WINDOW", close_dialog)
+        
+        main_frame = tk.Frame(dialog)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+        
+        # 分段大小
+        size_frame = tk.Frame(main_frame)
+        size_frame.pack(fill=tk.X, pady=(0, 10))
+        tk.Label(size_frame, text="每段大小 (KB):").pack(side=tk.LEFT)
+        size_var = tk.StringVar(value=str(CLIPBOARD_CHUNK_KB))
+        ttk.Entry(size_frame, textvariable=size_var, width=8).pack(side=tk.LEFT, padx=(5, 10))
+        
+        # 分段列表
+        list_frame = tk.Frame(main_frame)
+        list_frame.pack(fill=tk.BOTH, expand=True)
+        listbox = tk.Listbox(list_frame, font=('Consolas', 10), activestyle='none')
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=listbox.yview)
+        listbox.configure(yscrollcommand=scrollbar.set)
+        listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        status_var = tk.StringVar(value="正在分段...")
+        tk.Label(main_frame, textvariable=status_var, anchor=tk.W).pack(fill=tk.X, pady=(10, 10))
+        
+        state = {'chunks': [], 'next': 0}
+        
+        def describe(index, chunk):
+            groups = ""
+            if chunk.groups:
+                groups = chunk.groups[0] if len(chunk.groups) == 1 else f"{chunk.groups[0]} … {chunk.groups[-1]}"
+            return f"第{index + 1}段  {chunk.size / 1024:.0f}KB  {chunk.lines}行  {groups}"
+        
+        def on_split(chunks):
+            if not dialog.winfo_exists():
+                return
+            state['chunks'], state['next'] = chunks, 0
+            listbox.delete(0, tk.END)
+            for index, chunk in enumerate(chunks):
+                listbox.insert(tk.END, "   " + describe(index, chunk))
+            status_var.set(f"共{len(chunks)}段，按 Ctrl+N 或点击“复制下一段”依次复制")
+        
+        def on_split_error(e):
+            if dialog.winfo_exists():
+                status_var.set(f"分段失败: {str(e)}")
+        
+        def split():
+            try:
+                max_bytes = int(size_var.get()) * 1024
+            except ValueError:
+                messagebox.showwarning("警告", "每段大小应为正整数", parent=dialog)
+                return
+            if max_bytes <= 0:
+                messagebox.showwarning("警告", "每段大小应为正整数", parent=dialog)
+                return
+            status_var.set("正在分段...")
+            # 未分组的大量命令需要扫描命令边界，在后台线程完成
+            self.run_output_task(output, lambda: output.split_chunks(max_bytes), on_split, on_split_error)
+        
+        def copy_chunk(index):
+            chunks = state['chunks']
+            if not 0 <= index < len(chunks):
+                return
+            self.copy_content_to_clipboard(output.read_part(chunks[index]))
+            listbox.delete(index)
+            listbox.insert(index, "✓  " + describe(index, chunks[index]))
+            listbox.selection_clear(0, tk.END)
+            listbox.selection_set(index)
+            listbox.see(index)
+            state['next'] = index + 1
+            if state['next'] < len(chunks):
+                status_var.set(f"已复制第{index + 1}/{len(chunks)}段，粘贴到CAD后按 Ctrl+N 复制下一段")
+            else:
+                status_var.set(f"已复制第{index + 1}/{len(chunks)}段，全部分段已复制")
+        
+        def copy_selected():
+            selection = listbox.curselection()
+            copy_chunk(selection[0] if selection else state['next'])
+        
+        def copy_next():
+            copy_chunk(state['next'])
+        
+        ttk.Button(size_frame, text="重新分段", command=split).pack(side=tk.LEFT)
+        
+        button_frame = tk.Frame(main_frame)
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="复制下一段 (Ctrl+N)", command=copy_next).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="复制所选段", command=copy_selected).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="关闭", command=close_dialog, width=12).pack(side=tk.RIGHT)
+        
+        listbox.bind('<Double-Button-1>', lambda e: copy_selected())
+        dialog.bind('<Control-n>', lambda e: copy_next())
+        dialog.bind('<Return>', lambda e: copy_selected())
+        dialog.focus_set()
+        split()
     
     def show_group_copy_dialog(self):
         """显示分组复制选择对话框"""
@@ -1061,9 +1501,14 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
         if not self.coordinate_groups:
             messagebox.showwarning("警告", "没有分组数据")
             return
-            
+        
+        # 对话框不阻塞主界面，复制时使用打开时的结果和选项，而不是之后新的转换结果
+        source = self.group_copy_source()
+        output = source[0]
+        self.close_group_copy_dialog()
         dialog = tk.Toplevel(self.root)
         dialog.title("选择要复制的分组")
+        self.group_copy_dialog = dialog
         
         # 计算最合适的窗口大小
         # 内容分析：
@@ -1180,29 +1625,21 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
         button_frame.pack(fill=tk.X, pady=(15, 0))
         
         def copy_selected_groups():
-            selected_content = []
-            
-            for group_name, var in group_vars.items():
-                if var.get():
-                    coordinates = self.coordinate_groups[group_name]
-                    group_commands = self.generate_cad_commands(coordinates)
-                    selected_content.append(f"# {group_name}")
-                    selected_content.append(f"# 共{len(coordinates)}个坐标点")
-                    selected_content.append("")
-                    selected_content.append(group_commands)
-                    selected_content.append("")
+            selected_groups = [group_name for group_name, var in group_vars.items() if var.get()]
             
-            if selected_content:
-                content = "\n".join(selected_content)
+            if selected_groups:
+                content = self.get_group_commands(selected_groups, source)
                 self.copy_content_to_clipboard(content)
                 dialog.destroy()
             else:
                 messagebox.showwarning("警告", "请至少选择一个分组")
         
         def copy_all():
-            content = self.cad_text.get(1.0, tk.END).strip()
-            self.copy_content_to_clipboard(content)
             dialog.destroy()
+            if output.size > CLIPBOARD_CHUNK_THRESHOLD:
+                self.show_chunked_copy_dialog()
+            else:
+                self.copy_content_to_clipboard(output.read_text().strip())
         
         def cancel():
             dialog.destroy()
@@ -1220,6 +1657,64 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
         dialog.focus_set()
         # 完全移除阻塞，允许同时操作主界面
     
+    def close_group_copy_dialog(self):
+        if self.group_copy_dialog is not None and self.group_copy_dialog.winfo_exists():
+            self.group_copy_dialog.destroy()
+        self.group_copy_dialog = None
+    
+    def group_copy_source(self):
+        """分组复制使用的数据：(命令输出, 坐标数据, 结果的转换选项, 转换类型, 小数位数, 输出格式)"""
+        return (self.command_output, self.store, self.result_options,
+                self.convert_type.get(), self.get_precision(), self.get_text_format())
+    
+    def get_group_commands(self, group_names, source):
+        """所选分组的CAD命令文本（AutoLISP 格式时为只包含所选分组的程序），source 为 group_copy_source() 的返回值
+        
+        转换选项未改变时直接按字节范围读取本次分组输出，否则按当前转换类型生成并缓存每个分组的命令。
+        """
+        output, store, result_options, convert_type, precision, text_format = source
+        fast = (output is not None and output.group_starts and
+                result_options == (convert_type, True, precision, text_format))
+        if text_format == "lisp":
+            return self.get_group_lisp(group_names, output if fast else None, store, convert_type, precision)
+        if fast:
+            return output.read_groups(group_names)
+        
+        # 缓存只对应当前的坐标数据
+        cache = self.group_command_cache if store is self.store else {}
+        blocks = []
+        for group_name in group_names:
+            key = (convert_type, precision, group_name)
+            if key not in cache:
+                coordinates = store.groups[group_name]
+                texts = store.group_texts(group_name)
+                # 没有坐标原文时按完整精度输出
+                group_precision = None if precision == SOURCE_PRECISION and texts is None else precision
+                cache[key] = "\n".join([
+                    f"# {group_name}",
+                    f"# 共{len(coordinates)}个坐标点",
+                    "",
+                    generate_cad_commands(coordinates, convert_type, group_precision, texts),
+                    "",
+                ])
+            blocks.append(cache[key])
+        return "\n".join(blocks)
+    
+    def get_group_lisp(self, group_names, output, store, convert_type, precision):
+        """所选分组的 AutoLISP 程序；output 不为 None 时从本次程序输出中读取函数定义和所选分组的点表"""
+        if output is None:
+            if precision == SOURCE_PRECISION and store.texts is None:
+                precision = None
+            return "\n".join(iter_lisp_program(select_groups(store, group_names), convert_type, True,
+                                               precision=precision))
+        
+        # 第一个分组之前为程序说明和函数定义；最后一个分组的范围包含结尾的 (princ)
+        prefix = output.read_bytes(0, output.group_starts[0][2] - 1).decode('utf-8')
+        body = output.read_groups(group_names)
+        if not body.endswith("(princ)"):
+            body += "\n(princ)"
+        return prefix + "\n" + body
+    
     def copy_content_to_clipboard(self, content):
         """复制内容到剪贴板"""
         try:
@@ -1242,7 +1737,7 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
     
     def copy_cad_commands(self):
         """复制CAD命令到剪贴板"""
-        content = self.cad_text.get(1.0, tk.END).strip()
+        content = self.get_cad_text()
         if content:
             try:
                 # 使用tkinter的剪贴板
@@ -1255,62 +1750,161 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
             messagebox.showwarning("警告", "没有可复制的内容")
     
     def save_to_file(self):
-        """保存结果到文件"""
-        content = self.cad_text.get(1.0, tk.END).strip()
-        if not content:
+        """保存结果到文件 - 直接从命令输出缓存按块复制，不经过文本框"""
+        if self.command_output is None or self.converting:
             messagebox.showwarning("警告", "没有可保存的内容")
             return
         
+        if self.result_options is not None and self.result_options[3] == "lisp":
+            filename = filedialog.asksaveasfilename(
+                title="保存AutoLISP程序",
+                defaultextension=".lsp",
+                filetypes=[("AutoLISP程序", "*.lsp"), ("所有文件", "*.*")]
+            )
+        else:
+            filename = filedialog.asksaveasfilename(
+                title="保存CAD命令文件",
+                defaultextension=".txt",
+                filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")]
+            )
+        
+        if filename:
+            output = self.command_output
+            
+            def on_saved(_):
+                self.reset_status()
+                messagebox.showinfo("成功", f"文件已保存到: {filename}")
+            
+            def on_error(e):
+                self.reset_status()
+                messagebox.showerror("错误", f"保存文件时出现错误: {str(e)}")
+            
+            self.update_status("正在保存文件...", '#007bff')
+            self.run_output_task(
+                output, lambda: output.save(filename), on_saved, on_error)
+    
+    def export_scripts(self):
+        """把当前命令按大小上限写成多个 .scr 脚本文件，只在分组边界处切分，并写出分卷清单"""
+        if self.command_output is None or self.converting:
+            messagebox.showwarning("警告", "没有可导出的内容")
+            return
+        
         filename = filedialog.asksaveasfilename(
-            title="保存CAD命令文件",
-            defaultextension=".txt",
-            filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")]
+            title="分卷导出脚本",
+            defaultextension=".scr",
+            filetypes=[("CAD脚本", "*.scr"), ("所有文件", "*.*")]
+        )
+        if not filename:
+            return
+        max_kb = simpledialog.askinteger("分卷大小", "每个脚本文件的最大大小 (KB)：",
+                                         parent=self.root, initialvalue=SCRIPT_PART_KB, minvalue=1)
+        if max_kb is None:
+            return
+        
+        output = self.command_output
+        
+        def on_saved(manifest):
+            self.reset_status()
+            parts = manifest["parts"]
+            message = f"已导出{len(parts)}个脚本文件: {parts[0]['file']} 等"
+            oversize = [part["file"] for part in parts if part["oversize"]]
+            if oversize:
+                message += "\n\n以下文件只包含一个分组，但仍超过大小上限：\n" + "\n".join(oversize)
+            messagebox.showinfo("成功", message)
+        
+        def on_error(e):
+            self.reset_status()
+            messagebox.showerror("错误", f"导出脚本时出现错误: {str(e)}")
+        
+        self.update_status("正在导出脚本...", '#007bff')
+        self.run_output_task(
+            output, lambda: export_script_parts(output, filename, max_bytes=max_kb * 1024), on_saved, on_error)
+    
+    def export_dxf(self):
+        """按当前转换结果的类型、分组和精度直接写出DXF文件，CAD中打开即可，不需要粘贴命令"""
+        if self.result_options is None or self.converting:
+            messagebox.showwarning("警告", "没有可导出的内容")
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            title="导出DXF文件",
+            defaultextension=".dxf",
+            filetypes=[("DXF文件", "*.dxf"), ("所有文件", "*.*")]
         )
         
         if filename:
+            store = self.store
+            convert_type, grouped, precision, _ = self.result_options
+            
+            def on_saved(_):
+                self.reset_status()
+                messagebox.showinfo("成功", f"DXF文件已保存到: {filename}")
+            
+            def on_error(e):
+                self.reset_status()
+                messagebox.showerror("错误", f"导出DXF时出现错误: {str(e)}")
+            
+            self.update_status("正在导出DXF...", '#007bff')
+            self.run_background_task(
+                lambda: write_dxf(filename, store, convert_type, grouped, precision=precision), on_saved, on_error)
+    
+    def run_background_task(self, task, on_success, on_error):
+        """在后台线程执行 task()，完成后在主线程调用 on_success(结果) 或 on_error(异常)"""
+        result = {}
+        
+        def worker():
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                messagebox.showinfo("成功", f"文件已保存到: {filename}")
+                result['value'] = task()
             except Exception as e:
-                messagebox.showerror("错误", f"保存文件时出现错误: {str(e)}")
+                result['error'] = e
+        
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        
+        def poll():
+            if thread.is_alive():
+                self.root.after(WORKER_POLL_INTERVAL, poll)
+            elif 'error' in result:
+                on_error(result['error'])
+            else:
+                on_success(result.get('value'))
+        
+        self.root.after(WORKER_POLL_INTERVAL, poll)
+    
+    def run_output_task(self, output, task, on_success, on_error):
+        """同 run_background_task，在任务结束前新的转换结果或清空操作不会关闭命令输出缓存 output"""
+        output.acquire()
+        
+        def run():
+            try:
+                return task()
+            finally:
+                output.release()
+        
+        self.run_background_task(run, on_success, on_error)
     
     def clear_results(self):
         """清空结果显示"""
-        self.cad_text.delete(1.0, tk.END)
+        self.set_command_output(None)
         self.preview_text.delete(1.0, tk.END)
-        self.coordinates = []
-        
-        # 清除图形
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
+        self.set_store(CoordinateStore())
+        self.result_options = None
+        
+        # 隐藏图形（视图保留，下次转换时复用）并释放抽稀图层引用的坐标，进行中的预览渲染结果作废
+        self.preview_generation += 1
+        self.clear_preview()
+        for view in self.preview_views.values():
+            if not view.busy:
+                view.layers = []
     
     def cleanup_matplotlib(self):
-        """清理matplotlib资源"""
+        """清理matplotlib资源：销毁预览视图的画布"""
         try:
-            if HAS_MATPLOTLIB:
-                # 关闭所有图形
-                plt.close('all')
-                # 清除当前图形和轴
-                plt.clf()
-                plt.cla()
-                # 强制垃圾回收
-                import gc
-                gc.collect()
-                
-                # 记录清理成功
-                print("matplotlib资源已清理")
+            for view in self.preview_views.values():
+                view.widget.destroy()
+            self.preview_views.clear()
         except Exception as e:
-            # 改进异常处理
-            error_msg = f"清理matplotlib资源时出现错误: {e}"
-            print(error_msg)
-            # 尝试强制清理
-            try:
-                import gc
-                gc.collect()
-                print("已尝试强制垃圾回收")
-            except:
-                pass
+            print(f"清理matplotlib资源时出现错误: {e}")
     
     def cleanup_resources(self):
         """清理所有资源"""
@@ -1318,17 +1912,15 @@ CAD坐标转换器 v{VERSION} - 快捷键说明
             # 清理matplotlib资源
             self.cleanup_matplotlib()
             
-            # 清理坐标数据
-            self.coordinates = []
-            self.coordinate_groups = {}
+            # 清理坐标数据和命令输出缓存
+            self.set_store(CoordinateStore())
+            if self.command_output is not None:
+                self.command_output.close()
+                self.command_output = None
             
             # 清理图形框架
             for widget in self.graph_frame.winfo_children():
                 widget.destroy()
-            
-            # 强制垃圾回收
-            import gc
-            gc.collect()
                 
         except Exception as e:
             print(f"清理资源时出现错误: {e}")
@@ -1363,4 +1955,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # 打包为exe后，并行解析的子进程需要由此进入
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
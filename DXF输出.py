@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CAD坐标转换器 - DXF输出
+版本: 1.4.0
+作者: ViVi141
+邮箱: 747384120@qq.com
+描述: 把解析后的坐标直接写成 R12 (AC1009) 格式的 DXF 文件（文本或二进制），
+      CAD 中直接打开即可，不需要粘贴大量命令
+"""
+
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from 坐标转换引擎 import (CONVERT_TYPES, ITER_CHUNK, SOURCE_PRECISION, WRITE_BUFFER_SIZE, check_cancelled,
+                          get_cached_store, has_z_coordinates, load_groups, number_format, parse_coordinate_file,
+                          parse_coordinate_file_cached, select_groups, use_grouped_output)
+
+# 二进制DXF文件头
+BINARY_SENTINEL = b"AutoCAD Binary DXF\r\n\x1a\x00"
+
+# 不分组输出时使用的图层
+DEFAULT_LAYER = "0"
+
+# R12 图层名的最大长度
+LAYER_NAME_MAX = 31
+
+# 实体记录中引用坐标数组第 index 列的位置
+_Column = namedtuple('_Column', 'index')
+_X, _Y, _Z, _X2, _Y2, _Z2 = (_Column(i) for i in range(6))
+
+
+def dxf_layer_name(name, number):
+    """把第 number 个分组的名称转换为 R12 可用的图层名（大写字母、数字和 $-_，最长31个字符）
+
+    含非ASCII字符（如中文）的分组名改为 GROUP_<number>，其余不允许的字符替换为下划线。
+    """
+    if any(ord(char) > 127 for char in name):
+        return f"GROUP_{number}"
+    layer = "".join(char if char.isalnum() or char in "$-_" else "_" for char in name.upper())
+    return (layer or "_")[:LAYER_NAME_MAX]
+
+
+def _comment_text(name):
+    """写入文本DXF注释的分组名：非ASCII字符写成 \\U+XXXX"""
+    return "".join(char if ord(char) <= 127 else f"\\U+{ord(char):04X}" for char in name)
+
+
+def _layer_names(group_names):
+    """为各分组分配互不相同的图层名"""
+    layers = {}
+    used = set()
+    for number, group_name in enumerate(group_names, 1):
+        layer = base = dxf_layer_name(group_name, number)
+        suffix = 1
+        while layer in used:
+            suffix += 1
+            tag = f"_{suffix}"
+            layer = base[:LAYER_NAME_MAX - len(tag)] + tag
+        used.add(layer)
+        layers[group_name] = layer
+    return layers
+
+
+class _AsciiEncoder:
+    """文本DXF：组码右对齐3位，每个组码和值各占一行"""
+
+    # 文本DXF可以写 999 注释
+    comments = True
+
+    def __init__(self, precision):
+        self.number = number_format(precision)
+
+    def header(self):
+        return ""
+
+    def records(self, items, values=None):
+        """items 为 [(组码, 值)]，值为常量或 _Column；values 为 N x K 坐标数组时生成 N 条记录"""
+        template = []
+        columns = []
+        for code, value in items:
+            if isinstance(value, _Column):
+                template.append(f"{code:>3}\n{self.number}\n")
+                columns.append(value.index)
+            else:
+                text = repr(float(value)) if isinstance(value, float) else str(value)
+                template.append(f"{code:>3}\n" + text.replace("%", "%%") + "\n")
+        template = "".join(template)
+
+        if values is None:
+            return template % ()
+        if not len(values):
+            return ""
+        return (template * len(values)) % tuple(values[:, columns].ravel().tolist())
+
+
+class _BinaryEncoder:
+    """R12二进制DXF：组码1字节，字符串以0结尾，组码10-59为8字节double，60-79为2字节整数"""
+
+    comments = False
+
+    def header(self):
+        return BINARY_SENTINEL
+
+    @staticmethod
+    def _constant(code, value):
+        data = bytes([code])
+        if 10 <= code < 60:
+            return data + struct.pack('<d', float(value))
+        if 60 <= code < 80:
+            return data + struct.pack('<h', int(value))
+        return data + str(value).encode('ascii') + b'\0'
+
+    def records(self, items, values=None):
+        # 相邻的常量合并为一个定长字段，坐标为 <f8 字段，用结构数组一次生成全部记录
+        parts = []
+
+        def append_bytes(data):
+            if parts and isinstance(parts[-1], bytes):
+                parts[-1] += data
+            else:
+                parts.append(data)
+
+        for code, value in items:
+            if isinstance(value, _Column):
+                append_bytes(bytes([code]))
+                parts.append(value)
+            else:
+                append_bytes(self._constant(code, value))
+
+        if values is None:
+            return b"".join(parts)
+        if not len(values):
+            return b""
+
+        dtype = np.dtype([(f"f{i}", f"S{len(part)}" if isinstance(part, bytes) else '<f8')
+                          for i, part in enumerate(parts)])
+        records = np.empty(len(values), dtype=dtype)
+        for i, part in enumerate(parts):
+            records[f"f{i}"] = part if isinstance(part, bytes) else values[:, part.index]
+        return records.tobytes()
+
+
+def _iter_entities(encoder, points, convert_type, layer):
+    """逐段生成一组坐标的实体：多段线为 POLYLINE/VERTEX/SEQEND，直线为相邻点之间的 LINE，点为 POINT"""
+    if convert_type == "pline":
+        if has_z_coordinates(points):
+            polyline_flags, vertex_flags = 8, 32  # 3D多段线
+        else:
+            polyline_flags, vertex_flags = 0, 0
+        if len(points) > 2:
+            polyline_flags |= 1  # 与命令输出的 C 一致：超过2个点时闭合
+        yield encoder.records([(0, "POLYLINE"), (8, layer), (66, 1), (70, polyline_flags),
+                               (10, 0.0), (20, 0.0), (30, 0.0)])
+        vertex = [(0, "VERTEX"), (8, layer), (10, _X), (20, _Y), (30, _Z)]
+        if vertex_flags:
+            vertex.append((70, vertex_flags))
+        for start in range(0, len(points), ITER_CHUNK):
+            yield encoder.records(vertex, points[start:start + ITER_CHUNK])
+        yield encoder.records([(0, "SEQEND"), (8, layer)])
+
+    elif convert_type == "line":
+        line = [(0, "LINE"), (8, layer), (10, _X), (20, _Y), (30, _Z), (11, _X2), (21, _Y2), (31, _Z2)]
+        for start in range(0, len(points) - 1, ITER_CHUNK):
+            chunk = points[start:start + ITER_CHUNK + 1]
+            yield encoder.records(line, np.hstack([chunk[:-1], chunk[1:]]))
+
+    elif convert_type == "point":
+        point = [(0, "POINT"), (8, layer), (10, _X), (20, _Y), (30, _Z)]
+        for start in range(0, len(points), ITER_CHUNK):
+            yield encoder.records(point, points[start:start + ITER_CHUNK])
+
+
+def iter_dxf(store, convert_type="line", grouped=True, binary=False, precision=None, cancel_event=None):
+    """逐段生成DXF文件内容（生成器）：文本格式产生 str，二进制格式产生 bytes
+
+    按分组输出时每个分组单独成为一个实体并放在对应的图层上（见 dxf_layer_name），否则全部坐标作为一个实体放在图层 0；
+    图层名与分组名不同时，文本格式在图层表中用 999 注释记录原分组名。
+    precision 只影响文本格式的小数位数；原文输出模式在DXF中按完整精度处理。
+    """
+    if precision == SOURCE_PRECISION:
+        precision = None
+    encoder = _BinaryEncoder() if binary else _AsciiEncoder(precision)
+
+    if use_grouped_output(store.groups, grouped):
+        group_names = [name for name in store.group_names if store.group_size(name)]
+        layers = _layer_names(group_names)
+        entities = [(layers[name], name) for name in group_names]
+    else:
+        layers = {DEFAULT_LAYER: DEFAULT_LAYER}
+        entities = [(DEFAULT_LAYER, None)]
+
+    yield encoder.header()
+    yield encoder.records([(0, "SECTION"), (2, "HEADER"), (9, "$ACADVER"), (1, "AC1009"), (0, "ENDSEC")])
+
+    # 图层表：按分组依次使用颜色1-7，便于区分
+    table = [(0, "SECTION"), (2, "TABLES"), (0, "TABLE"), (2, "LAYER"), (70, len(layers))]
+    for number, (group_name, layer) in enumerate(layers.items()):
+        if encoder.comments and group_name != layer:
+            table.append((999, f"{layer} = {_comment_text(group_name)}"))
+        table += [(0, "LAYER"), (2, layer), (70, 0), (62, number % 7 + 1), (6, "CONTINUOUS")]
+    table += [(0, "ENDTAB"), (0, "ENDSEC")]
+    yield encoder.records(table)
+
+    yield encoder.records([(0, "SECTION"), (2, "ENTITIES")])
+    for layer, group_name in entities:
+        check_cancelled(cancel_event)
+        points = store.points if group_name is None else store.group_points(group_name)
+        if len(points):
+            yield from _iter_entities(encoder, points, convert_type, layer)
+    yield encoder.records([(0, "ENDSEC"), (0, "EOF")])
+
+
+def write_dxf(output, store, convert_type="line", grouped=True, binary=False, precision=None, cancel_event=None):
+    """把坐标写成DXF文件；output 为文件路径，或已打开的文件对象（文本格式为文本文件，二进制格式为二进制文件）
+
+    内容逐段生成并写出，不在内存中保存整个图形。返回写入的字符数（二进制为字节数）。
+    """
+    if isinstance(output, str):
+        mode = 'wb' if binary else 'w'
+        encoding = None if binary else 'ascii'
+        with open(output, mode, encoding=encoding, buffering=WRITE_BUFFER_SIZE) as f:
+            return write_dxf(f, store, convert_type, grouped, binary, precision, cancel_event)
+
+    written = 0
+    for piece in iter_dxf(store, convert_type, grouped, binary, precision, cancel_event):
+        output.write(piece)
+        written += len(piece)
+    return written
+
+
+def export_dxf_file(path, output, convert_type="line", grouped=True, binary=False, encoding='utf-8', progress=None,
+                    cancel_event=None, group_names=None, workers=None, precision=None, cache=False):
+    """转换单个坐标文件并直接写成DXF（参数含义同 export_file）
+
+    返回 CoordinateStore；文件中没有有效坐标时不写入任何内容。
+    """
+    if convert_type not in CONVERT_TYPES:
+        raise ValueError(f"不支持的转换类型: {convert_type}")
+
+    store = get_cached_store(path, encoding) if cache else None
+    if store is not None:
+        if group_names is not None:
+            store = select_groups(store, group_names)
+    elif group_names is not None:
+        store = load_groups(path, group_names, encoding, cancel_event)
+    elif cache:
+        store = parse_coordinate_file_cached(path, encoding, progress, cancel_event, workers)
+    else:
+        store = parse_coordinate_file(path, encoding, progress, cancel_event, workers)
+    if len(store):
+        write_dxf(output, store, convert_type, grouped, binary, precision, cancel_event)
+    return store
@@ -0,0 +1,1911 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CAD坐标转换器 - 转换引擎
+版本: 1.4.0
+作者: ViVi141
+邮箱: 747384120@qq.com
+描述: 坐标解析与CAD命令生成的核心逻辑，不依赖tkinter和matplotlib，
+      图形界面和命令行工具共用
+"""
+
+import codecs
+import concurrent.futures
+import itertools
+import json
+import os
+import re
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+# 版本信息
+VERSION = "1.4.0"
+AUTHOR = "ViVi141"
+EMAIL = "747384120@qq.com"
+
+# 支持的转换类型
+CONVERT_TYPES = ("pline", "line", "point")
+
+# 文本输出格式：逐条执行的CAD命令，或用 entmake 直接创建实体的 AutoLISP 程序
+TEXT_FORMATS = ("commands", "lisp")
+
+# 未出现分组标识前的坐标所属分组
+DEFAULT_GROUP = "默认组"
+
+# 坐标值合理性上限，超出视为异常数据
+MAX_COORD_VALUE = 1e10
+
+# 坐标格式: x, y, z (可选) - 支持科学计数法，更严格的匹配
+COORD_PATTERN = re.compile(r'^\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)\s*,\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)\s*,?\s*([+-]?\d+\.?\d*(?:[eE][+-]?\d+)?)?\s*$')
+
+# 批量解析时每次读取的字符数
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# 文件达到该大小时使用多进程并行解析，每个进程任务处理的字节数
+PARALLEL_PARSE_THRESHOLD = 64 * 1024 * 1024
+PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+
+# precision 取该值时直接输出源文件中的坐标原文（解析时需保留原文）
+SOURCE_PRECISION = "source"
+
+# 按分组生成命令时，坐标总数达到该值时按CPU核数自动并行生成各分组的命令
+PARALLEL_GENERATE_THRESHOLD = 1000000
+# 并行生成时每个任务包含的坐标点数：相邻的小分组合并为一个任务，减少进程间通信
+GENERATE_BATCH_POINTS = 200000
+# 并行生成时同时提交的任务数为进程数的倍数，限制尚未写出的结果占用的内存
+GENERATE_WINDOW_FACTOR = 2
+
+# 解析结果缓存保留的文件数
+PARSE_CACHE_SIZE = 2
+
+# 达到该大小的文件解析后在旁边写入二进制缓存文件（sidecar），下次打开时直接内存映射
+SIDECAR_MIN_SIZE = 16 * 1024 * 1024
+# 二进制缓存的格式版本，格式变化时旧缓存自动失效
+SIDECAR_VERSION = 1
+
+# 按元组遍历坐标数组、逐段生成命令时每次处理的点数
+ITER_CHUNK = 65536
+
+# 写出CAD命令文件时的缓冲区大小
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# 分组标识行的首字（UTF-8编码），建立分组索引时按字节查找
+_GROUP_MARKER_START = '第'.encode('utf-8')
+
+# 文件预览：统计行数和分组时读取的开头字节数，显示的开头字符数和结尾字节数
+PREVIEW_SAMPLE_SIZE = 1024 * 1024
+PREVIEW_HEAD_CHARS = 1000
+PREVIEW_TAIL_BYTES = 500
+
+# 命令输出缓存的稀疏行索引间隔（行数），以及查找/复制时每次读取的字节数
+LINE_INDEX_STEP = 256
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+
+# 流式转换的结果：坐标点数、分组数、是否包含Z坐标
+StreamResult = namedtuple('StreamResult', 'point_count group_count has_z')
+
+# 分卷脚本：一个分卷包含的分组和要写出的字节范围，size/lines 为写出后的字节数和行数
+ScriptPart = namedtuple('ScriptPart', 'groups ranges size lines')
+
+# 以这些字节开头的命令行（line、point、pline 和 # 注释）前可以切分剪贴板分段，不会拆开多段线的顶点
+_COMMAND_START_BYTES = np.zeros(256, dtype=bool)
+_COMMAND_START_BYTES[list(b'lp#')] = True
+
+# 批量解析时纯坐标行允许出现的字节，以及可以出现在小数点/逗号前后的字节
+_PLAIN_BYTES = np.zeros(256, dtype=bool)
+_PLAIN_BYTES[list(b'0123456789.,eE+- \t\r\n')] = True
+_DIGIT_BYTES = np.zeros(256, dtype=bool)
+_DIGIT_BYTES[list(b'0123456789')] = True
+_NUMBER_START_BYTES = _DIGIT_BYTES.copy()
+_NUMBER_START_BYTES[list(b'+-')] = True
+_NUMBER_END_BYTES = _DIGIT_BYTES.copy()
+_NUMBER_END_BYTES[ord('.')] = True
+
+# 整块转换失败时使用的纯坐标行格式：只含ASCII数字、逗号分隔、空格/制表符。
+# 连续的同列数坐标行作为一段整体转换，其余行（分组标识、注释、异常格式）逐行处理
+_NUMBER = r'[+-]?[0-9]+\.?[0-9]*(?:[eE][+-]?[0-9]+)?'
+_XY_LINE = rf'[ \t]*{_NUMBER}[ \t]*,[ \t]*{_NUMBER}[ \t\r]*\n'
+_XYZ_LINE = rf'[ \t]*{_NUMBER}[ \t]*,[ \t]*{_NUMBER}[ \t]*,[ \t]*{_NUMBER}[ \t\r]*\n'
+_COORD_RUN_PATTERN = re.compile(rf'^(?:(?P<xy>(?:{_XY_LINE})+)|(?P<xyz>(?:{_XYZ_LINE})+))', re.M)
+
+
+class ConversionCancelled(Exception):
+    """转换被用户取消"""
+
+
+def check_cancelled(cancel_event):
+    """cancel_event（threading.Event）已被设置时抛出 ConversionCancelled"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise ConversionCancelled()
+
+
+def is_group_marker(line):
+    """判断（已去除首尾空白的）行是否是分组标识，例如 第1组"""
+    return line.startswith('第') and '组' in line
+
+
+def parse_coordinate_line(line, warn=None):
+    """解析单行坐标
+
+    返回 (x, y, z) 元组；格式不匹配或数值异常时返回 None。
+    warn 为可选的警告回调，接收一条提示文本。
+    """
+    match = COORD_PATTERN.match(line)
+    if not match:
+        return None
+
+    try:
+        x, y, z = match.group(1), match.group(2), match.group(3) if match.group(3) else "0"
+        coord = (float(x), float(y), float(z))
+    except ValueError:
+        # 跳过无效的坐标数据
+        if warn:
+            warn(f"警告：跳过无效坐标: {line}")
+        return None
+
+    # 验证坐标值的合理性
+    if abs(coord[0]) > MAX_COORD_VALUE or abs(coord[1]) > MAX_COORD_VALUE or abs(coord[2]) > MAX_COORD_VALUE:
+        if warn:
+            warn(f"警告：跳过异常坐标值: {coord}")
+        return None
+
+    return coord
+
+
+def _empty_points():
+    return np.empty((0, 3), dtype=np.float64)
+
+
+def _empty_texts():
+    return np.empty((0, 3), dtype='S1')
+
+
+def _valid_rows(points, warn=None):
+    """坐标值在合理范围内的行；全部有效时返回 None"""
+    valid = (np.abs(points) <= MAX_COORD_VALUE).all(axis=1)
+    if valid.all():
+        return None
+    if warn:
+        for coord in points[~valid].tolist():
+            warn(f"警告：跳过异常坐标值: {tuple(coord)}")
+    return valid
+
+
+def _filter_points(points, warn=None):
+    """过滤超出合理范围的坐标值"""
+    valid = _valid_rows(points, warn)
+    return points if valid is None else points[valid]
+
+
+def _place_columns(values, columns, dtype=np.float64):
+    """把按行顺序排列的2列/3列数值放入 N x 3 数组，缺少的Z为0（原文为空）"""
+    if (columns == 3).all():
+        return values.reshape(-1, 3)
+    result = np.zeros((len(columns), 3), dtype=dtype)
+    if (columns == 2).all():
+        result[:, :2] = values.reshape(-1, 2)
+    else:
+        rows = np.repeat(np.arange(len(columns)), columns)
+        row_offsets = np.repeat(np.cumsum(columns) - columns, columns)
+        result[rows, np.arange(len(values)) - row_offsets] = values
+    return result
+
+
+def _split_tokens(data, columns):
+    """把以换行结尾的纯坐标行拆分为 N x 3 的坐标原文数组（bytes，去除空白，缺少的Z为空）"""
+    tokens = data.translate(None, b' \t\r').replace(b'\n', b',').split(b',')[:-1]
+    values = np.array(tokens, dtype=bytes) if tokens else np.empty(0, dtype='S1')
+    return _place_columns(values, columns, values.dtype)
+
+
+def _line_tokens(line):
+    """单行坐标的原文 (x, y, z)，没有Z时为空"""
+    match = COORD_PATTERN.match(line)
+    return tuple((token or '').encode('utf-8') for token in match.groups())
+
+
+def _parse_numbers(data, expected):
+    """将逗号/换行分隔的数字整体转换为float64数组，数量不符时返回 None"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            values = np.fromstring(data.replace(b'\n', b','), dtype=np.float64, sep=',')
+        except ValueError:
+            return None
+    if values.size != expected:
+        return None
+    return values
+
+
+def _skip_blanks(buf, positions, step):
+    """从 positions 开始沿 step 方向跳过空格和制表符"""
+    positions = positions.copy()
+    while len(positions):
+        inside = (positions >= 0) & (positions < len(buf))
+        blank = np.zeros(len(positions), dtype=bool)
+        blank[inside] = (buf[positions[inside]] == 32) | (buf[positions[inside]] == 9)
+        if not blank.any():
+            break
+        positions[blank] += step
+    return positions
+
+
+def _convert_block(data, keep_text=False):
+    """字节级识别纯坐标行并整块转换
+
+    data 为以换行结尾的UTF-8字节串。纯坐标行指只含ASCII数字和逗号、有2或3列、
+    不以小数点开头且没有空字段的行；其余行留给逐行规则处理。
+    返回 (points, special_lines, texts)：points 为全部纯坐标行按顺序组成的 N x 3 数组（未过滤异常值），
+    special_lines 为 [(之前的纯坐标行数, 行文本)]，texts 为与 points 对应的坐标原文（keep_text 为 False 时为 None）；
+    纯坐标行无法整体转换时返回 None。
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    line_ends = np.flatnonzero(buf == 10)
+    special = np.zeros(len(line_ends), dtype=bool)
+
+    def mark(positions):
+        special[np.searchsorted(line_ends, positions)] = True
+
+    # 含有其他字符的行（分组标识、注释、非ASCII数字等）
+    mark(np.flatnonzero(~_PLAIN_BYTES[buf]))
+
+    # 只能有2或3列
+    commas = np.flatnonzero(buf == 44)
+    comma_count = np.bincount(np.searchsorted(line_ends, commas), minlength=len(line_ends))
+    special |= (comma_count == 0) | (comma_count > 2)
+
+    # 小数点前必须是数字（原正则不接受 .5 这类写法）
+    dots = np.flatnonzero(buf == 46)
+    mark(dots[(dots == 0) | ~_DIGIT_BYTES[buf[dots - 1]]])
+
+    # 逗号两侧不能是空字段（例如 x,y, 交由逐行规则处理）
+    after = _skip_blanks(buf, commas + 1, 1)
+    mark(commas[~_NUMBER_START_BYTES[buf[after]]])
+    before = _skip_blanks(buf, commas - 1, -1)
+    mark(commas[(before < 0) | ~_NUMBER_END_BYTES[buf[np.maximum(before, 0)]]])
+
+    plain = ~special
+    columns = comma_count[plain] + 1
+    special_index = np.flatnonzero(special)
+
+    if len(special_index) == 0:
+        plain_data = data
+    else:
+        line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+        parts = []
+        start = 0
+        for index in special_index.tolist():
+            parts.append(data[start:line_starts[index]])
+            start = line_ends[index] + 1
+        parts.append(data[start:])
+        plain_data = b''.join(parts)
+
+    values = _parse_numbers(plain_data, int(columns.sum()))
+    if values is None:
+        return None
+
+    # 两列的行Z坐标补0
+    points = _place_columns(values, columns)
+    texts = _split_tokens(plain_data, columns) if keep_text else None
+
+    special_lines = []
+    if len(special_index):
+        line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+        for order, index in enumerate(special_index.tolist()):
+            line = data[line_starts[index]:line_ends[index]].decode('utf-8')
+            special_lines.append((index - order, line))
+
+    return points, special_lines, texts
+
+
+def _convert_run(run, columns):
+    """将一段已由正则校验的纯坐标行整体转换为 N x 3 的float64数组"""
+    data = run.encode('ascii')
+    values = _parse_numbers(data, data.count(b'\n') * columns)
+    if values is None:
+        return None
+
+    values = values.reshape(-1, columns)
+    if columns == 3:
+        return values
+    points = np.zeros((len(values), 3), dtype=np.float64)
+    points[:, :2] = values
+    return points
+
+
+def parse_text_block(text, current_group=DEFAULT_GROUP, warn=None, keep_text=False):
+    """批量解析一段由完整行组成的文本
+
+    纯坐标行通过 numpy 整块转换，分组标识、注释和格式特殊的行按原有的逐行正则规则处理，
+    结果与逐行解析完全一致。
+    返回 (pieces, current_group)：pieces 为按文件顺序排列的 [(分组名, N x 3 坐标数组)]，
+    遇到分组标识时追加一个空数组条目以记录分组出现的顺序；current_group 为块末尾所在的分组。
+    current_group 传入 None 表示块开头所属的分组未知（并行解析时由前面的块决定），
+    此时第一个分组标识之前的坐标分组名为 None。
+    keep_text 为 True 时，含有坐标的条目为 (分组名, 坐标数组, 坐标原文数组)。
+    """
+    if text and not text.endswith('\n'):
+        text += '\n'
+
+    pieces = []
+    pending = []
+    pending_texts = []
+
+    def flush_pending():
+        if pending:
+            piece = (current_group, np.array(pending, dtype=np.float64))
+            if keep_text:
+                piece += (np.array(pending_texts, dtype=bytes),)
+            pieces.append(piece)
+            del pending[:]
+            del pending_texts[:]
+
+    def add_points(points, texts=None):
+        flush_pending()
+        valid = _valid_rows(points, warn)
+        if valid is not None:
+            points = points[valid]
+            texts = None if texts is None else texts[valid]
+        if len(points):
+            pieces.append((current_group, points) if texts is None else (current_group, points, texts))
+
+    def parse_gap(gap):
+        nonlocal current_group
+        for line in gap.split('\n'):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            # 检查是否是分组标识
+            if is_group_marker(line):
+                flush_pending()
+                current_group = line
+                pieces.append((current_group, _empty_points()))
+                continue
+
+            coord = parse_coordinate_line(line, warn)
+            if coord is not None:
+                pending.append(coord)
+                if keep_text:
+                    pending_texts.append(_line_tokens(line))
+
+    block = _convert_block(text.encode('utf-8'), keep_text) if text else None
+    if block is not None:
+        points, special_lines, texts = block
+        row = 0
+        for row_end, line in special_lines:
+            if row_end > row:
+                add_points(points[row:row_end], None if texts is None else texts[row:row_end])
+                row = row_end
+            parse_gap(line)
+        if len(points) > row:
+            add_points(points[row:], None if texts is None else texts[row:])
+        flush_pending()
+        return pieces, current_group
+
+    # 块内有无法整体转换的行时，按正则识别出的连续坐标段分别转换
+    position = 0
+    for match in _COORD_RUN_PATTERN.finditer(text):
+        if match.start() > position:
+            parse_gap(text[position:match.start()])
+        position = match.end()
+
+        run = match.group('xy')
+        columns = 2
+        if run is None:
+            run = match.group('xyz')
+            columns = 3
+
+        points = _convert_run(run, columns)
+        if points is None:
+            # 整段转换失败时退回逐行解析
+            parse_gap(run)
+            continue
+        texts = None
+        if keep_text:
+            texts = _split_tokens(run.encode('ascii'), np.full(len(points), columns))
+        add_points(points, texts)
+
+    if position < len(text):
+        parse_gap(text[position:])
+    flush_pending()
+
+    return pieces, current_group
+
+
+def iter_text_blocks(f, block_size=BLOCK_SIZE):
+    """按块读取文本文件，每块都在换行处截断，保证只包含完整行"""
+    remainder = ''
+    while True:
+        chunk = f.read(block_size)
+        if not chunk:
+            break
+        chunk = remainder + chunk
+        cut = chunk.rfind('\n') + 1
+        if cut == 0:
+            remainder = chunk
+            continue
+        remainder = chunk[cut:]
+        yield chunk[:cut]
+    if remainder:
+        yield remainder
+
+
+class CoordinateView(Sequence):
+    """N x 3 坐标数组的只读列表视图
+
+    按下标或遍历得到 (x, y, z) 元组，切片返回新的视图而不复制数据，
+    np.asarray(view) 直接得到底层数组。
+    """
+
+    __slots__ = ('array',)
+
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CoordinateView(self.array[index])
+        return tuple(self.array[index].tolist())
+
+    def __iter__(self):
+        for start in range(0, len(self.array), ITER_CHUNK):
+            yield from map(tuple, self.array[start:start + ITER_CHUNK].tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.array
+        return self.array.astype(dtype, copy=False)
+
+    def __repr__(self):
+        return f"CoordinateView({len(self)}个坐标点)"
+
+
+class GroupsView(Mapping):
+    """分组坐标的只读字典视图：{分组名: CoordinateView}，按分组首次出现的顺序排列"""
+
+    __slots__ = ('store',)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, group_name):
+        return CoordinateView(self.store.group_points(group_name))
+
+    def __iter__(self):
+        return iter(self.store.group_names)
+
+    def __len__(self):
+        return len(self.store.group_names)
+
+    def __contains__(self, group_name):
+        return group_name in self.store.group_index
+
+    def __repr__(self):
+        return f"GroupsView({len(self)}个分组)"
+
+
+class CoordinateStore:
+    """坐标数据的列式存储
+
+    points 为按文件顺序排列的连续 N x 3 float64 数组，每个点只存一份；
+    group_names 为按首次出现顺序排列的分组名（包括没有坐标点的分组）；
+    segments 为 K x 3 int64 分段表 (分组序号, 起始行, 结束行)，按文件顺序排列，
+    同一分组在文件中多次出现时对应多段。
+    texts 为与 points 逐行对应的坐标原文（N x 3 bytes 数组，缺少的Z为空），解析时未保留原文则为 None。
+    """
+
+    def __init__(self, points=None, group_names=(), segments=None, texts=None):
+        self.points = _empty_points() if points is None else points
+        self.texts = texts
+        self.group_names = list(group_names)
+        self.segments = np.empty((0, 3), dtype=np.int64) if segments is None else segments
+        self.group_index = {name: index for index, name in enumerate(self.group_names)}
+
+        self._group_ranges = [[] for _ in self.group_names]
+        for index, start, end in self.segments.tolist():
+            self._group_ranges[index].append((start, end))
+
+    @classmethod
+    def from_pieces(cls, pieces):
+        """由 parse_text_block 产生的 [(分组名, 坐标数组)] 按顺序构建存储"""
+        group_index = {}
+        segments = []
+        arrays = []
+        text_arrays = []
+        count = 0
+
+        for group_name, points, *texts in pieces:
+            index = group_index.setdefault(group_name, len(group_index))
+            if not len(points):
+                continue
+            if segments and segments[-1][0] == index and segments[-1][2] == count:
+                segments[-1][2] += len(points)
+            else:
+                segments.append([index, count, count + len(points)])
+            arrays.append(points)
+            text_arrays.append(texts[0] if texts else None)
+            count += len(points)
+
+        points = np.concatenate(arrays) if arrays else _empty_points()
+        segments = np.array(segments, dtype=np.int64).reshape(-1, 3)
+        # 只有全部坐标都带有原文时才保留原文
+        texts = None
+        if text_arrays and all(array is not None for array in text_arrays):
+            texts = np.concatenate(text_arrays)
+        return cls(np.ascontiguousarray(points), group_index, segments, texts)
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def coordinates(self):
+        """全部坐标的列表视图（文件顺序）"""
+        return CoordinateView(self.points)
+
+    @property
+    def groups(self):
+        """分组坐标的字典视图"""
+        return GroupsView(self)
+
+    def group_ranges(self, group_name):
+        """分组在 points 中的 [(起始行, 结束行)] 列表"""
+        return self._group_ranges[self.group_index[group_name]]
+
+    def group_size(self, group_name):
+        return sum(end - start for start, end in self.group_ranges(group_name))
+
+    def group_points(self, group_name):
+        """分组的坐标数组；分组在文件中只出现一段时直接返回切片视图"""
+        ranges = self.group_ranges(group_name)
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            return self.points[start:end]
+        if not ranges:
+            return _empty_points()
+        return np.concatenate([self.points[start:end] for start, end in ranges])
+
+    def group_texts(self, group_name):
+        """分组的坐标原文数组；未保留原文时返回 None"""
+        if self.texts is None:
+            return None
+        ranges = self.group_ranges(group_name)
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            return self.texts[start:end]
+        if not ranges:
+            return _empty_texts()
+        return np.concatenate([self.texts[start:end] for start, end in ranges])
+
+    def has_z(self):
+        return has_z_coordinates(self.points)
+
+
+def parse_coordinates(content, warn=None):
+    """解析字符串形式的坐标数据，返回 CoordinateStore"""
+    pieces, _ = parse_text_block(content, warn=warn)
+    return CoordinateStore.from_pieces(pieces)
+
+
+def _is_utf8(encoding):
+    return encoding.lower().replace('-', '').replace('_', '') == 'utf8'
+
+
+def parse_coordinate_file(path, encoding='utf-8', progress=None, cancel_event=None, workers=None,
+                          keep_text=False):
+    """分块批量解析坐标文件，返回 CoordinateStore
+
+    progress 为可选回调 progress(已读取字节数, 已处理行数, 有效坐标数)，每读取一块调用一次。
+    cancel_event 被设置时在下一块开始前抛出 ConversionCancelled。
+    workers 为并行解析的进程数：None 表示UTF-8文件达到 PARALLEL_PARSE_THRESHOLD 时按CPU核数自动并行，
+    1 表示始终在当前线程解析。keep_text 为 True 时同时保留坐标原文（store.texts）。
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+        if os.path.getsize(path) < PARALLEL_PARSE_THRESHOLD:
+            workers = 1
+    if workers > 1 and _is_utf8(encoding):
+        try:
+            return parse_coordinate_file_parallel(path, workers, progress, cancel_event, keep_text=keep_text)
+        except concurrent.futures.process.BrokenProcessPool:
+            # 进程池不可用（例如受限环境），退回单进程解析
+            pass
+
+    pieces = []
+    current_group = DEFAULT_GROUP
+    line_count = 0
+    valid_coords = 0
+
+    with open(path, 'r', encoding=encoding) as f:
+        for block in iter_text_blocks(f):
+            check_cancelled(cancel_event)
+            block_pieces, current_group = parse_text_block(block, current_group, keep_text=keep_text)
+            pieces.extend(block_pieces)
+
+            line_count += block.count('\n')
+            valid_coords += sum(len(piece[1]) for piece in block_pieces)
+            if progress:
+                progress(f.buffer.tell(), line_count, valid_coords)
+
+    return CoordinateStore.from_pieces(pieces)
+
+
+def _parse_byte_range(path, start, end, keep_text=False):
+    """进程池任务：解析UTF-8文件中由完整行组成的字节范围 [start, end)
+
+    返回 (pieces, current_group, 行数)，范围开头所属的分组名为 None。
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # 与文本模式读取一致的换行处理
+    text = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    pieces, current_group = parse_text_block(text, None, keep_text=keep_text)
+    return pieces, current_group, text.count('\n')
+
+
+def split_line_ranges(path, chunk_size=PARALLEL_CHUNK_SIZE):
+    """把文件按约 chunk_size 字节切分为在换行处断开的 [(起始字节, 结束字节)]"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        while bounds[-1] + chunk_size < size:
+            f.seek(bounds[-1] + chunk_size)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def parse_coordinate_file_parallel(path, workers=None, progress=None, cancel_event=None,
+                                   chunk_size=PARALLEL_CHUNK_SIZE, keep_text=False):
+    """用进程池并行解析UTF-8坐标文件，结果与 parse_coordinate_file 的单进程解析完全相同
+
+    文件在换行处切分为若干块分别解析，再按文件顺序拼接：块开头在第一个分组标识之前的坐标
+    归入前一块末尾所在的分组，因此跨块的分组保持原来的分组名和点顺序。
+    """
+    pieces = []
+    current_group = DEFAULT_GROUP
+    line_count = 0
+    valid_coords = 0
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        ranges = split_line_ranges(path, chunk_size)
+        futures = [executor.submit(_parse_byte_range, path, start, end, keep_text) for start, end in ranges]
+        try:
+            for (start, end), future in zip(ranges, futures):
+                while True:
+                    check_cancelled(cancel_event)
+                    try:
+                        block_pieces, block_group, block_lines = future.result(timeout=0.1)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        continue
+
+                for group_name, *arrays in block_pieces:
+                    pieces.append((current_group if group_name is None else group_name, *arrays))
+                if block_group is not None:
+                    current_group = block_group
+
+                line_count += block_lines
+                valid_coords += sum(len(piece[1]) for piece in block_pieces)
+                if progress:
+                    progress(end, line_count, valid_coords)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return CoordinateStore.from_pieces(pieces)
+
+
+def file_fingerprint(path):
+    """文件指纹 (绝对路径, 大小, 修改时间ns)，用于判断缓存是否过期"""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+class GroupIndex:
+    """坐标文件的分组索引
+
+    一次按字节扫描记录每个分组标识行的位置：ranges[i] 为第 i 段内容的字节范围，
+    line_ranges[i] 为对应的行范围（从0开始，不含标识行）。第0段是第一个分组标识之前的内容，
+    属于默认组；names[i] 为第 i 段所属的分组名。之后可以只读取和解析需要的分组。
+    只支持UTF-8编码、以 \\n 或 \\r\\n 换行的文件。
+    """
+
+    def __init__(self, path, fingerprint, names, ranges, line_ranges):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.names = names
+        self.ranges = ranges
+        self.line_ranges = line_ranges
+        self._default_points = None
+
+    @classmethod
+    def build(cls, path, cancel_event=None):
+        """扫描文件建立索引；文件含有单独的 \\r 换行时返回 None（需要完整解析）"""
+        fingerprint = file_fingerprint(path)
+        names = [DEFAULT_GROUP]
+        starts = [0]
+        lines = [0]
+        marker_offsets = []
+        marker_lines = []
+        offset = 0
+        line_count = 0
+        ends_with_newline = True
+        remainder = b''
+
+        with open(path, 'rb') as f:
+            while True:
+                check_cancelled(cancel_event)
+                chunk = f.read(BLOCK_SIZE)
+                data = remainder + chunk
+                cut = data.rfind(b'\n') + 1 if chunk else len(data)
+                if not data:
+                    break
+                data, remainder = data[:cut], data[cut:]
+                if data.count(b'\r') != data.count(b'\r\n'):
+                    return None
+
+                counted = 0
+                position = data.find(_GROUP_MARKER_START)
+                while position >= 0:
+                    line_start = data.rfind(b'\n', 0, position) + 1
+                    line_end = data.find(b'\n', position)
+                    line_end = len(data) if line_end < 0 else line_end
+                    line = data[line_start:line_end].decode('utf-8').strip()
+                    if is_group_marker(line):
+                        line_count += data.count(b'\n', counted, line_start)
+                        counted = line_start
+                        names.append(line)
+                        marker_offsets.append(offset + line_start)
+                        marker_lines.append(line_count)
+                        starts.append(offset + min(line_end + 1, len(data)))
+                        lines.append(line_count + 1)
+                    position = data.find(_GROUP_MARKER_START, line_end)
+
+                line_count += data.count(b'\n', counted)
+                offset += len(data)
+                if data:
+                    ends_with_newline = data.endswith(b'\n')
+                if not chunk:
+                    break
+
+        total_lines = line_count + (0 if ends_with_newline else 1)
+        ends = marker_offsets + [offset]
+        line_ends = marker_lines + [total_lines]
+        ranges = np.array([starts, ends], dtype=np.int64).T
+        line_ranges = np.array([lines, line_ends], dtype=np.int64).T
+        return cls(path, fingerprint, names, ranges, line_ranges)
+
+    @property
+    def group_names(self):
+        """按首次出现顺序排列的分组名；默认组只在第一个分组标识之前有坐标时出现"""
+        names = list(dict.fromkeys(self.names[1:]))
+        if len(self.default_points()):
+            names.insert(0, DEFAULT_GROUP)
+        return names
+
+    def default_points(self):
+        """第一个分组标识之前的坐标（首次调用时解析并缓存）"""
+        if self._default_points is None:
+            pieces = self.parse_segment(0)
+            self._default_points = np.concatenate([piece[1] for piece in pieces]) if pieces else _empty_points()
+        return self._default_points
+
+    def read_segment(self, segment):
+        """读取第 segment 段的文本"""
+        start, end = self.ranges[segment].tolist()
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return data.decode('utf-8').replace('\r\n', '\n')
+
+    def parse_segment(self, segment, keep_text=False):
+        """解析第 segment 段，返回 parse_text_block 格式的 pieces（不含分组标识条目）"""
+        pieces, _ = parse_text_block(self.read_segment(segment), self.names[segment], keep_text=keep_text)
+        return pieces
+
+    def load(self, group_names=None, cancel_event=None, keep_text=False):
+        """只解析指定的分组（默认全部），返回按文件顺序排列的 CoordinateStore"""
+        wanted = None if group_names is None else set(group_names)
+        pieces = []
+        for segment, name in enumerate(self.names):
+            if wanted is not None and name not in wanted:
+                continue
+            check_cancelled(cancel_event)
+            if segment == 0:
+                if keep_text:
+                    pieces.extend(self.parse_segment(0, keep_text))
+                elif len(self.default_points()):
+                    pieces.append((DEFAULT_GROUP, self.default_points()))
+                continue
+            pieces.append((name, _empty_points()))
+            pieces.extend(self.parse_segment(segment, keep_text))
+        return CoordinateStore.from_pieces(pieces)
+
+
+# 解析结果缓存：(文件指纹, 编码) -> CoordinateStore，最近使用的排在最后
+_parse_cache = OrderedDict()
+
+
+def sidecar_paths(path):
+    """二进制缓存文件的路径 (坐标数组 .npy, 坐标原文 .npy, 分组信息 .npz)，位于坐标文件旁边"""
+    return path + ".points.npy", path + ".texts.npy", path + ".meta.npz"
+
+
+def load_sidecar(path, encoding='utf-8', keep_text=False):
+    """读取坐标文件旁的二进制缓存，坐标数组以只读内存映射方式打开，不复制数据
+
+    缓存不存在、版本或编码不同、记录的文件大小和修改时间与当前文件不一致（缓存过期）、
+    内容不完整或缺少所需的坐标原文时返回 None。
+    """
+    points_path, texts_path, meta_path = sidecar_paths(path)
+    try:
+        _, size, mtime_ns = file_fingerprint(path)
+        with np.load(meta_path, allow_pickle=False) as meta:
+            if (meta['version'].item() != SIDECAR_VERSION or meta['encoding'].item() != encoding
+                    or meta['fingerprint'].tolist() != [size, mtime_ns]):
+                return None
+            group_names = meta['group_names'].tolist()
+            segments = meta['segments']
+
+        points = np.load(points_path, mmap_mode='r')
+        texts = None
+        if keep_text:
+            texts = np.load(texts_path, mmap_mode='r')
+            if texts.shape != points.shape:
+                return None
+    except (OSError, ValueError, KeyError):
+        return None
+
+    count = int(segments[:, 2].max()) if len(segments) else 0
+    if points.ndim != 2 or points.shape[1] != 3 or points.dtype != np.float64 or len(points) != count:
+        return None
+    return CoordinateStore(points, group_names, segments, texts)
+
+
+def write_sidecar(path, store, encoding='utf-8', fingerprint=None):
+    """在坐标文件旁写入二进制缓存；fingerprint 为解析前取得的 file_fingerprint，解析期间文件被修改时缓存随即失效
+
+    各文件先写入临时文件再重命名，分组信息最后写入，写入中断不会留下看似有效的缓存。
+    目录不可写等错误直接忽略（返回 False），不影响转换。
+    """
+    _, size, mtime_ns = fingerprint or file_fingerprint(path)
+    points_path, texts_path, meta_path = sidecar_paths(path)
+
+    def save(target, save_function, *args, **kwds):
+        temp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                save_function(f, *args, **kwds)
+            os.replace(temp_path, target)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    try:
+        save(points_path, np.save, np.ascontiguousarray(store.points), allow_pickle=False)
+        if store.texts is not None:
+            save(texts_path, np.save, np.ascontiguousarray(store.texts), allow_pickle=False)
+        elif os.path.exists(texts_path):
+            os.remove(texts_path)
+        save(meta_path, np.savez, version=np.array(SIDECAR_VERSION), encoding=np.array(encoding),
+             fingerprint=np.array([size, mtime_ns], dtype=np.int64),
+             group_names=np.array(store.group_names, dtype=str), segments=store.segments)
+    except OSError:
+        return False
+    return True
+
+
+def uses_sidecar(store, path):
+    """store 的坐标是否以内存映射方式读取自 path 旁的二进制缓存"""
+    points = store.points
+    return (isinstance(points, np.memmap) and points.filename is not None
+            and os.path.abspath(points.filename) == os.path.abspath(sidecar_paths(path)[0]))
+
+
+def _forget_file(abs_path):
+    """从内存缓存中移除该文件的全部解析结果"""
+    for old_key in [k for k in _parse_cache if k[0][0] == abs_path]:
+        del _parse_cache[old_key]
+
+
+def _remember_store(key, store):
+    """把解析结果放入内存缓存，同一路径只保留最新版本"""
+    _forget_file(key[0][0])
+    _parse_cache[key] = store
+    while len(_parse_cache) > PARSE_CACHE_SIZE:
+        _parse_cache.popitem(last=False)
+
+
+def get_cached_store(path, encoding='utf-8', keep_text=False, sidecar=True):
+    """返回文件未变化时缓存的解析结果，没有缓存、文件已修改或缺少所需的坐标原文时返回 None
+
+    先查内存缓存，sidecar 为 True 时再查坐标文件旁的二进制缓存（见 load_sidecar）。
+    """
+    key = (file_fingerprint(path), encoding)
+    store = _parse_cache.get(key)
+    if store is not None and not (keep_text and store.texts is None and len(store)):
+        _parse_cache.move_to_end(key)
+        return store
+
+    store = load_sidecar(path, encoding, keep_text) if sidecar else None
+    if store is not None:
+        _remember_store(key, store)
+    return store
+
+
+def parse_coordinate_file_cached(path, encoding='utf-8', progress=None, cancel_event=None, workers=None,
+                                 keep_text=False, sidecar=True):
+    """带缓存的 parse_coordinate_file
+
+    以 (绝对路径, 大小, 修改时间) 识别文件，文件未变化时直接返回上次的 CoordinateStore，
+    只修改转换选项再次转换时不需要重新解析。sidecar 为 True 时还使用坐标文件旁的二进制缓存：
+    达到 SIDECAR_MIN_SIZE 的文件解析后写入缓存，之后（包括程序重新启动后）直接内存映射读取。
+    改写缓存前会释放内存缓存中的旧结果；调用方持有的、以内存映射读取该缓存的旧结果（见 uses_sidecar）
+    需要先自行释放，Windows 下映射打开着的文件不能被替换。
+    """
+    key = (file_fingerprint(path), encoding)
+    store = get_cached_store(path, encoding, keep_text, sidecar)
+    if store is not None:
+        return store
+
+    store = parse_coordinate_file(path, encoding, progress, cancel_event, workers, keep_text)
+    if sidecar and len(store) and key[0][1] >= SIDECAR_MIN_SIZE:
+        _forget_file(key[0][0])
+        write_sidecar(path, store, encoding, key[0])
+    _remember_store(key, store)
+    return store
+
+
+def clear_parse_cache():
+    _parse_cache.clear()
+
+
+# 按绝对路径缓存的分组索引，文件大小或修改时间变化后重新扫描
+_group_index_cache = {}
+
+
+def get_group_index(path, cancel_event=None):
+    """返回文件的分组索引（优先使用内存缓存）；不支持索引的文件返回 None"""
+    fingerprint = file_fingerprint(path)
+    index = _group_index_cache.get(fingerprint[0])
+    if index is None or index.fingerprint != fingerprint:
+        index = GroupIndex.build(path, cancel_event)
+        _group_index_cache[fingerprint[0]] = index
+    return index
+
+
+def load_groups(path, group_names=None, encoding='utf-8', cancel_event=None, keep_text=False):
+    """只解析文件中的指定分组，返回 CoordinateStore
+
+    先通过分组索引定位各分组的字节范围，再只读取这些范围；
+    非UTF-8编码或无法建立索引的文件退回完整解析后再筛选。
+    """
+    index = get_group_index(path, cancel_event) if _is_utf8(encoding) else None
+    if index is not None:
+        return index.load(group_names, cancel_event, keep_text)
+
+    store = parse_coordinate_file(path, encoding, cancel_event=cancel_event, keep_text=keep_text)
+    if group_names is None:
+        return store
+    return select_groups(store, group_names)
+
+
+def select_groups(store, group_names):
+    """从已解析的存储中筛选指定分组，返回新的 CoordinateStore"""
+    wanted = set(group_names)
+    pieces = [(name, _empty_points()) for name in store.group_names if name in wanted]
+    for index, start, end in store.segments.tolist():
+        if store.group_names[index] in wanted:
+            piece = (store.group_names[index], store.points[start:end])
+            if store.texts is not None:
+                piece += (store.texts[start:end],)
+            pieces.append(piece)
+    return CoordinateStore.from_pieces(pieces)
+
+
+# 文件预览结果：tail 为 None 表示开头部分之后没有省略的内容；
+# exact 为 False 时 line_count 是按开头样本估算的行数，group_count 只统计样本中的分组
+FilePreview = namedtuple('FilePreview', 'size head tail line_count group_count exact sample_size')
+
+
+def preview_file(path, encoding='utf-8', sample_size=PREVIEW_SAMPLE_SIZE,
+                 head_chars=PREVIEW_HEAD_CHARS, tail_bytes=PREVIEW_TAIL_BYTES):
+    """只读取文件开头的样本和结尾的一小段，返回 FilePreview
+
+    文件不超过样本大小时行数和分组数是精确值，否则按样本中的换行密度估算总行数。
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        sample = f.read(sample_size)
+        tail = b''
+        if size > len(sample):
+            f.seek(max(len(sample), size - tail_bytes))
+            tail = f.read()
+
+    exact = len(sample) >= size
+    if exact:
+        line_count = sample.count(b'\n') + (1 if sample and not sample.endswith(b'\n') else 0)
+    else:
+        # 只保留完整的行，避免在多字节字符中间截断
+        sample = sample[:sample.rfind(b'\n') + 1] or sample
+        line_count = int(sample.count(b'\n') * size / len(sample))
+
+    text = sample.decode(encoding)
+    group_count = sum(1 for line in text.split('\n') if is_group_marker(line.strip()))
+
+    if exact and len(text) > head_chars:
+        tail = text[max(head_chars, len(text) - tail_bytes):]
+    elif exact:
+        tail = None
+    else:
+        tail = tail.decode(encoding, errors='replace')
+    if tail:
+        # 结尾部分从完整的行开始
+        tail = tail[tail.find('\n') + 1:]
+    return FilePreview(size, text[:head_chars], tail, line_count, group_count, exact, len(sample))
+
+
+def as_points(coordinates):
+    """将坐标视图、数组或 (x, y, z) 元组列表统一为 N x 3 float64 数组，尽量不复制"""
+    points = np.asarray(coordinates, dtype=np.float64)
+    if points.size == 0:
+        return _empty_points()
+    return points
+
+
+def has_z_coordinates(coordinates):
+    """检查是否包含非零Z坐标"""
+    points = as_points(coordinates)
+    return bool((points[:, 2] != 0).any())
+
+
+def use_grouped_output(groups, grouped):
+    """是否按分组生成命令：勾选分组处理且存在多个分组"""
+    return bool(grouped) and len(groups) > 1
+
+
+def number_format(precision):
+    """坐标数值的 % 格式：precision 为 None 时为 %r（与 str(float) 相同，完整精度），否则保留固定小数位"""
+    if precision is None:
+        return '%r'
+    precision = int(precision)
+    if precision < 0:
+        raise ValueError(f"小数位数不能为负数: {precision}")
+    return f'%.{precision}f'
+
+
+def lisp_number_format(precision):
+    """AutoLISP 点表中坐标数值的 % 格式：保留0位小数时也写出小数部分，使坐标读为实数而不是整数"""
+    if precision is not None and int(precision) == 0:
+        return '%.0f.0'
+    return number_format(precision)
+
+
+def format_points(points, with_z=True, precision=None, prefix="", separator=",", suffix="", number=None):
+    """把 N x 3 坐标数组批量格式化为以换行分隔的 "前缀x,y[,z]后缀" 文本
+
+    整块坐标通过一次 % 运算格式化，不逐点调用 f-string；with_z 为 False 时只输出X,Y。
+    number 为数值的 % 格式，默认为 number_format(precision)。
+    """
+    if not len(points):
+        return ""
+    columns = 3 if with_z else 2
+    template = prefix + separator.join([number or number_format(precision)] * columns) + suffix
+    values = points[:, :columns].ravel().tolist()
+    return "\n".join([template] * len(points)) % tuple(values)
+
+
+def format_texts(texts, with_z=True, prefix="", separator=",", suffix=""):
+    """把 N x 3 坐标原文数组直接拼接为以换行分隔的 "前缀x,y[,z]后缀" 文本，缺少的Z输出为0"""
+    if not len(texts):
+        return ""
+    columns = 3 if with_z else 2
+    values = texts[:, :columns]
+    if with_z:
+        values = np.where(values == b'', b'0', values)
+    template = (prefix.encode('utf-8') + separator.encode('utf-8').join([b"%s"] * columns)
+                + suffix.encode('utf-8'))
+    return (b"\n".join([template] * len(texts)) % tuple(values.ravel().tolist())).decode('utf-8')
+
+
+def _lisp_real_texts(texts):
+    """坐标原文中的整数（没有小数点和指数）补上 .0，缺少的Z写成 0.0，使 AutoLISP 读为实数"""
+    texts = np.where(texts == b'', b'0', texts)
+    integer = (np.char.find(texts, b'.') < 0) & (np.char.find(np.char.lower(texts), b'e') < 0)
+    return np.where(integer, np.char.add(texts, b'.0'), texts)
+
+
+def iter_cad_commands(coordinates, convert_type="line", precision=None, texts=None):
+    """逐段生成CAD命令（生成器）
+
+    每次产生一段文本，段内可以包含多行；各段以换行连接即为完整的命令文本。
+    坐标按 ITER_CHUNK 个点一批格式化，内存占用与坐标数量无关。
+    coordinates 可以是坐标数组、CoordinateView 或 (x, y, z) 元组列表；
+    precision 为保留的小数位数，None 表示完整精度，SOURCE_PRECISION 表示直接输出 texts 中的坐标原文。
+    """
+    points = as_points(coordinates)
+    if not len(points):
+        yield "未找到有效的坐标数据"
+        return
+    if precision == SOURCE_PRECISION and texts is None:
+        raise ValueError("解析时没有保留坐标原文，无法按原文输出")
+
+    # 检查是否包含Z坐标
+    has_z_coords = has_z_coordinates(points)
+
+    yield from _command_header(convert_type, len(points), has_z_coords)
+    blocks = ((points[start:start + ITER_CHUNK], None if texts is None else texts[start:start + ITER_CHUNK])
+              for start in range(0, len(points), ITER_CHUNK))
+    yield from _iter_command_body(blocks, convert_type, has_z_coords, precision)
+
+
+def _command_header(convert_type, count, has_z_coords):
+    """CAD命令开头的说明行"""
+    # 添加CAD命令说明
+    return [
+        f"# CAD命令 - {convert_type.upper()} 格式",
+        f"# 共{count}个坐标点",
+        "# 包含Z坐标 (3D)" if has_z_coords else "# 仅X,Y坐标 (2D)",
+        "",
+    ]
+
+
+def _iter_command_body(blocks, convert_type, has_z_coords, precision):
+    """逐段生成CAD命令正文（生成器）
+
+    blocks 逐块产生非空的 (坐标数组, 坐标原文数组或 None)，可以来自内存中的数组，也可以边读文件边产生；
+    结果只取决于坐标序列本身，与分块方式无关。
+    """
+    def format_block(points, texts, prefix=""):
+        if precision == SOURCE_PRECISION:
+            return format_texts(texts, has_z_coords, prefix)
+        return format_points(points, has_z_coords, precision, prefix)
+
+    count = 0
+    if convert_type == "pline":
+        # 生成多段线命令 - 改进格式，2D多段线只输出X,Y
+        yield "pline"
+        for points, texts in blocks:
+            count += len(points)
+            yield format_block(points, texts)
+        # 添加闭合选项（可选）
+        if count > 2:
+            yield "C"  # 使用C终止多段线
+        else:
+            yield "C^"  # 使用C^终止多段线
+
+    elif convert_type == "line":
+        # 生成直线命令 - 连接相邻点形成线段，上一块的最后一个点与本块的第一个点相连
+        previous = []
+        for points, texts in blocks:
+            count += len(points)
+            # 每个点只格式化一次，再按相邻点两两组合
+            lines = previous + format_block(points, texts).split("\n")
+            previous = lines[-1:]
+            if len(lines) < 2:
+                continue
+            pairs = [None] * (2 * (len(lines) - 1))
+            pairs[0::2] = lines[:-1]
+            pairs[1::2] = lines[1:]
+            yield "\n".join(["line %s %s"] * (len(lines) - 1)) % tuple(pairs)
+        # 添加空行结束line命令组
+        if count > 1:
+            yield ""
+
+    elif convert_type == "point":
+        # 生成点命令
+        for points, texts in blocks:
+            yield format_block(points, texts, prefix="point ")
+        # 添加空行结束point命令组
+        yield ""
+
+
+def iter_grouped_cad_commands(groups, convert_type="line", cancel_event=None, on_group=None, precision=None,
+                              group_texts=None):
+    """按分组逐段生成CAD命令（生成器） - 确保每个组都是独立的闭合图形
+
+    on_group 为可选回调 on_group(分组名)，在产生每个分组的第一段之前调用；
+    按原文输出时 group_texts(分组名) 返回该分组的坐标原文数组。
+    """
+    for group_name, coordinates in groups.items():
+        check_cancelled(cancel_event)
+        if not len(coordinates):
+            continue
+
+        if on_group:
+            on_group(group_name)
+        texts = group_texts(group_name) if group_texts else None
+        yield from _iter_group_commands(group_name, coordinates, convert_type, precision, texts)
+
+
+def _iter_group_commands(group_name, coordinates, convert_type, precision, texts):
+    """一个分组的命令：分组说明、该组的CAD命令和分隔空行"""
+    yield f"# {group_name}"
+    yield f"# 共{len(coordinates)}个坐标点"
+    yield ""
+
+    # 生成该组的CAD命令
+    yield from iter_cad_commands(coordinates, convert_type, precision, texts)
+    yield ""  # 空行分隔
+
+
+def _generate_group_blocks(batch, convert_type, precision):
+    """进程池任务：生成一批分组的命令，返回与 batch [(分组名, 坐标数组, 坐标原文)] 对应的文本列表"""
+    return ["\n".join(_iter_group_commands(group_name, points, convert_type, precision, texts))
+            for group_name, points, texts in batch]
+
+
+def iter_grouped_cad_commands_parallel(groups, convert_type="line", cancel_event=None, on_group=None,
+                                       precision=None, group_texts=None, workers=None,
+                                       batch_points=GENERATE_BATCH_POINTS):
+    """用进程池并行生成各分组的命令（生成器），结果与 iter_grouped_cad_commands 完全相同
+
+    相邻分组合并为约 batch_points 个点的任务提交，最多同时有 workers * GENERATE_WINDOW_FACTOR 个任务
+    在处理；每个分组的命令作为一段按分组原顺序产生，前面的分组完成后即可写出。
+    进程池在产生第一段之前就不可用时，退回单进程生成。
+    """
+    workers = workers or os.cpu_count() or 1
+
+    def iter_batches():
+        batch, batch_size = [], 0
+        for group_name, coordinates in groups.items():
+            if not len(coordinates):
+                continue
+            texts = group_texts(group_name) if group_texts else None
+            batch.append((group_name, as_points(coordinates), texts))
+            batch_size += len(coordinates)
+            if batch_size >= batch_points:
+                yield batch
+                batch, batch_size = [], 0
+        if batch:
+            yield batch
+
+    started = False
+    try:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            batches = iter_batches()
+            pending = deque()
+            try:
+                while True:
+                    while len(pending) < workers * GENERATE_WINDOW_FACTOR:
+                        batch = next(batches, None)
+                        if batch is None:
+                            break
+                        pending.append(([group_name for group_name, _, _ in batch],
+                                        executor.submit(_generate_group_blocks, batch, convert_type, precision)))
+                    if not pending:
+                        break
+
+                    group_names, future = pending.popleft()
+                    while True:
+                        check_cancelled(cancel_event)
+                        try:
+                            blocks = future.result(timeout=0.1)
+                            break
+                        except concurrent.futures.TimeoutError:
+                            continue
+
+                    for group_name, block in zip(group_names, blocks):
+                        if on_group:
+                            on_group(group_name)
+                        started = True
+                        yield block
+            except BaseException:
+                for _, future in pending:
+                    future.cancel()
+                raise
+    except concurrent.futures.process.BrokenProcessPool:
+        if started:
+            raise
+        # 进程池不可用（例如受限环境），退回单进程生成
+        yield from iter_grouped_cad_commands(groups, convert_type, cancel_event, on_group, precision, group_texts)
+
+
+# AutoLISP 程序中创建实体的函数：二维多段线为 LWPOLYLINE，含Z坐标时为三维 POLYLINE
+_LISP_FUNCTIONS = {
+    "pline": """(defun cadconv:pline (pts closed)
+  (if (caddr (car pts))
+    (progn
+      (entmake (list '(0 . "POLYLINE") '(66 . 1) (cons 70 (if closed 9 8)) '(10 0.0 0.0 0.0)))
+      (foreach p pts (entmake (list '(0 . "VERTEX") (cons 10 p) '(70 . 32))))
+      (entmakex '((0 . "SEQEND"))))
+    (entmakex (append (list '(0 . "LWPOLYLINE") '(100 . "AcDbEntity") '(100 . "AcDbPolyline")
+                            (cons 90 (length pts)) (cons 70 (if closed 1 0)))
+                      (mapcar '(lambda (p) (cons 10 p)) pts)))))""",
+    "line": """(defun cadconv:line (pts)
+  (while (cadr pts)
+    (entmakex (list '(0 . "LINE") (cons 10 (car pts)) (cons 11 (cadr pts))))
+    (setq pts (cdr pts))))""",
+    "point": """(defun cadconv:point (pts)
+  (foreach p pts (entmakex (list '(0 . "POINT") (cons 10 p)))))""",
+}
+
+
+def iter_lisp_program(store, convert_type="line", grouped=True, cancel_event=None, on_group=None, precision=None):
+    """逐段生成 AutoLISP 程序（生成器）
+
+    坐标作为程序中的点表数据，由 entmake 直接创建实体：多段线每组一个实体，
+    直线为相邻点之间的 LINE，点为 POINT。比逐条回显命令执行快得多，也更短；
+    可粘贴到CAD命令行，或保存为 .lsp 后用 (load) 加载。各参数含义同 iter_conversion_commands。
+    """
+    if convert_type not in CONVERT_TYPES:
+        raise ValueError(f"不支持的转换类型: {convert_type}")
+    if not len(store):
+        yield "未找到有效的坐标数据"
+        return
+    if precision == SOURCE_PRECISION and store.texts is None:
+        raise ValueError("解析时没有保留坐标原文，无法按原文输出")
+
+    if use_grouped_output(store.groups, grouped):
+        groups = [(name, store.group_points(name)) for name in store.group_names if store.group_size(name)]
+    else:
+        groups = [(None, store.points)]
+
+    yield f";; CAD坐标转换 - AutoLISP 程序 ({convert_type.upper()})"
+    yield f";; 共{len(store)}个坐标点"
+    yield ";; 粘贴到CAD命令行执行，或保存为 .lsp 文件后用 (load \"文件名\") 加载"
+    yield _LISP_FUNCTIONS[convert_type]
+    yield ""
+
+    for group_name, points in groups:
+        check_cancelled(cancel_event)
+        if group_name is None:
+            texts = store.texts
+        else:
+            texts = store.group_texts(group_name)
+            if on_group:
+                on_group(group_name)
+            yield f";; {group_name}"
+            yield f";; 共{len(points)}个坐标点"
+
+        # 二维点写成 (x y)，含Z坐标的点写成 (x y z)；坐标一律写成实数
+        has_z_coords = has_z_coordinates(points)
+        yield f"(cadconv:{convert_type} '("
+        for start in range(0, len(points), ITER_CHUNK):
+            if precision == SOURCE_PRECISION:
+                yield format_texts(_lisp_real_texts(texts[start:start + ITER_CHUNK]), has_z_coords, "(", " ", ")")
+            else:
+                yield format_points(points[start:start + ITER_CHUNK], has_z_coords, precision, "(", " ", ")",
+                                    lisp_number_format(precision))
+        if convert_type == "pline":
+            # 与命令输出的 C 一致：超过2个点时闭合
+            yield ") T)" if len(points) > 2 else ") nil)"
+        else:
+            yield "))"
+        yield ""
+
+    yield "(princ)"
+
+
+def iter_conversion_commands(store, convert_type="line", grouped=True, cancel_event=None, on_group=None,
+                             precision=None, text_format="commands", workers=None):
+    """按转换选项逐段生成整个坐标存储的CAD命令；text_format 为 "lisp" 时生成 AutoLISP 程序
+
+    workers 为按分组生成时的并行进程数：None 表示坐标数达到 PARALLEL_GENERATE_THRESHOLD 时
+    按CPU核数自动并行，1 表示始终在当前线程生成。
+    """
+    if text_format == "lisp":
+        return iter_lisp_program(store, convert_type, grouped, cancel_event, on_group, precision)
+    if text_format not in TEXT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {text_format}")
+    if use_grouped_output(store.groups, grouped):
+        # 分组处理 - 每个组独立生成命令
+        if workers is None:
+            workers = os.cpu_count() or 1
+            if len(store) < PARALLEL_GENERATE_THRESHOLD:
+                workers = 1
+        if workers > 1:
+            return iter_grouped_cad_commands_parallel(store.groups, convert_type, cancel_event, on_group,
+                                                      precision, store.group_texts, workers)
+        return iter_grouped_cad_commands(store.groups, convert_type, cancel_event, on_group, precision,
+                                         store.group_texts)
+    # 非分组处理 - 使用全部坐标
+    return iter_cad_commands(store.points, convert_type, precision, store.texts)
+
+
+def generate_cad_commands(coordinates, convert_type="line", precision=None, texts=None):
+    """生成CAD命令"""
+    return "\n".join(iter_cad_commands(coordinates, convert_type, precision, texts))
+
+
+def generate_grouped_cad_commands(groups, convert_type="line", cancel_event=None, precision=None, group_texts=None):
+    """按分组生成CAD命令 - 确保每个组都是独立的闭合图形"""
+    return "\n".join(iter_grouped_cad_commands(groups, convert_type, cancel_event, precision=precision,
+                                                group_texts=group_texts))
+
+
+def write_cad_commands(output, commands, cancel_event=None, buffer_size=WRITE_BUFFER_SIZE):
+    """将逐段生成的CAD命令写入文件
+
+    output 为文件路径或已打开的文本文件对象；commands 为 iter_* 生成器产生的文本段，
+    段与段之间写入换行，结果与对应 generate_* 函数返回的字符串相同。
+    文本段边生成边写入，内存占用与坐标数量无关。返回写入的字符数。
+    """
+    if not hasattr(output, 'write'):
+        with open(output, 'w', encoding='utf-8', buffering=buffer_size) as f:
+            return write_cad_commands(f, commands, cancel_event)
+
+    written = 0
+    separator = ""
+    for text in commands:
+        check_cancelled(cancel_event)
+        output.write(separator)
+        output.write(text)
+        written += len(separator) + len(text)
+        separator = "\n"
+    return written
+
+
+class CommandOutput:
+    """CAD命令输出的磁盘缓存
+
+    生成的命令以UTF-8写入临时文件，内存中只保留稀疏行索引（每 LINE_INDEX_STEP 行一个字节偏移）
+    和各分组的起始位置；显示可见行、查找、复制和保存都直接读取临时文件。
+    写入在后台线程完成后，读取方法可以在任意线程调用。
+    后台保存等仍在读取时，用 acquire/release 登记，close 会推迟到最后一个使用者 release 之后。
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._lock = threading.Lock()
+        self._users = 0
+        self._close_pending = False
+        self._line_offsets = [0]
+        self._separator = False
+        self.size = 0
+        self.newline_count = 0
+        self.group_starts = []  # [(分组名, 起始行, 起始字节)]
+        self._group_ranges = None
+
+    @property
+    def line_count(self):
+        """总行数（与按换行拆分文本得到的行数相同）"""
+        return self.newline_count + 1 if self.size else 0
+
+    def mark_group(self, group_name):
+        """记录下一段文本为某个分组的开始，供 iter_grouped_cad_commands 的 on_group 回调使用"""
+        pending = 1 if self._separator else 0
+        self.group_starts.append((group_name, self.newline_count + pending, self.size + pending))
+
+    def _append(self, data):
+        count = data.count(b'\n')
+        if count and self.newline_count // LINE_INDEX_STEP != (self.newline_count + count) // LINE_INDEX_STEP:
+            # 第 k 个换行之后开始的行，行号为 newline_count + k + 1
+            newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10)
+            line_numbers = self.newline_count + 1 + np.arange(len(newlines))
+            marks = newlines[line_numbers % LINE_INDEX_STEP == 0]
+            self._line_offsets.extend((self.size + marks + 1).tolist())
+
+        self._file.write(data)
+        self.size += len(data)
+        self.newline_count += count
+
+    def write(self, commands, cancel_event=None, progress=None):
+        """写入逐段生成的命令，段与段之间以换行分隔
+
+        progress 为可选回调 progress(已写入字节数, 已写入行数)，约每 READ_CHUNK_SIZE 字节调用一次。
+        """
+        reported = 0
+        for text in commands:
+            check_cancelled(cancel_event)
+            data = text.encode('utf-8')
+            if self._separator:
+                data = b'\n' + data
+            self._append(data)
+            self._separator = True
+
+            if progress and self.size - reported >= READ_CHUNK_SIZE:
+                reported = self.size
+                progress(self.size, self.newline_count)
+
+        self._file.flush()
+
+    def read_lines(self, start, count):
+        """读取从第 start 行（从0开始）起的 count 行文本"""
+        start = max(0, min(start, self.line_count))
+        block = start // LINE_INDEX_STEP
+        with self._lock:
+            self._file.seek(self._line_offsets[block])
+            skip = start - block * LINE_INDEX_STEP
+            lines = list(itertools.islice(self._file, skip, skip + count))
+        # 文本以换行结尾时，最后一个空行不会被逐行读取到
+        if len(lines) < count and start + len(lines) == self.line_count - 1:
+            lines.append(b'')
+        return [line.decode('utf-8').rstrip('\n') for line in lines]
+
+    def read_bytes(self, start, end):
+        """读取字节范围 [start, end) 的原始内容"""
+        with self._lock:
+            self._file.seek(start)
+            return self._file.read(max(0, end - start))
+
+    def group_ranges(self):
+        """各分组命令文本的字节范围 {分组名: (起始字节, 结束字节)}，不含分组之间的分隔换行"""
+        if self._group_ranges is None:
+            starts = [start for _, _, start in self.group_starts]
+            ends = [start - 1 for start in starts[1:]] + [self.size]
+            self._group_ranges = {name: (start, end)
+                                  for (name, _, start), end in zip(self.group_starts, ends)}
+        return self._group_ranges
+
+    def read_groups(self, group_names):
+        """按字节范围读取指定分组的命令文本，与分组分别生成后以换行连接的结果相同"""
+        ranges = self.group_ranges()
+        return b'\n'.join(self.read_bytes(*ranges[name]) for name in group_names).decode('utf-8')
+
+    def split_parts(self, max_bytes=None, max_lines=None):
+        """按字节数或行数上限把命令划分为若干分卷（ScriptPart 列表），只在分组边界处切分
+
+        第一个分组之前的内容（如 AutoLISP 程序的函数定义）会重复写入每个分卷，保证各分卷可以单独执行；
+        单个分组超过上限时独占一个分卷。未分组的输出不能切分，整体作为一个分卷。
+        """
+        if not self.group_starts:
+            return [ScriptPart([], [(0, self.size)], self.size + 1, self.line_count)]
+
+        _, first_line, first_start = self.group_starts[0]
+        prefix = [(0, first_start - 1)] if first_start else []
+        prefix_size = first_start
+        ranges = self.group_ranges()
+        line_starts = [line for _, line, _ in self.group_starts[1:]] + [self.line_count]
+
+        parts = []
+        groups, part_ranges, size, lines = [], list(prefix), prefix_size, first_line
+        for (name, line, _), next_line in zip(self.group_starts, line_starts):
+            start, end = ranges[name]
+            group_size, group_lines = end - start + 1, next_line - line
+            over_bytes = max_bytes is not None and size + group_size > max_bytes
+            over_lines = max_lines is not None and lines + group_lines > max_lines
+            if groups and (over_bytes or over_lines):
+                parts.append(ScriptPart(groups, part_ranges, size, lines))
+                groups, part_ranges, size, lines = [], list(prefix), prefix_size, first_line
+            groups.append(name)
+            part_ranges.append((start, end))
+            size += group_size
+            lines += group_lines
+        parts.append(ScriptPart(groups, part_ranges, size, lines))
+        return parts
+
+    def _split_range(self, start, end, max_bytes):
+        """在命令边界处把字节范围 [start, end) 切分为不超过 max_bytes 的片段 [(起始, 结束, 行数)]
+
+        片段不含末尾的换行；两个命令边界之间的内容超过上限时单独成为一个片段。
+        """
+        positions, line_numbers = [], []
+        newline_count = 0
+        for position in range(start, end, READ_CHUNK_SIZE):
+            # 多读一个字节，用于判断块末尾换行之后的下一行
+            data = np.frombuffer(self.read_bytes(position, min(position + READ_CHUNK_SIZE + 1, end)), dtype=np.uint8)
+            newlines = np.flatnonzero(data[:READ_CHUNK_SIZE] == 10)
+            line_starts = newlines + 1
+            valid = line_starts < len(data)
+            valid[valid] = _COMMAND_START_BYTES[data[line_starts[valid]]]
+            positions.append(position + line_starts[valid])
+            line_numbers.append(newline_count + 1 + np.flatnonzero(valid))
+            newline_count += len(newlines)
+        positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int64)
+        line_numbers = np.concatenate(line_numbers) if line_numbers else np.empty(0, dtype=np.int64)
+
+        pieces = []
+        current, current_line = start, 0
+        while end - current > max_bytes:
+            # 优先取上限内最远的边界，没有时取下一个边界
+            index = np.searchsorted(positions, current + max_bytes, 'right') - 1
+            if index < 0 or positions[index] <= current:
+                index = np.searchsorted(positions, current, 'right')
+                if index == len(positions):
+                    break
+            boundary, boundary_line = int(positions[index]), int(line_numbers[index])
+            pieces.append((current, boundary - 1, boundary_line - current_line))
+            current, current_line = boundary, boundary_line
+        pieces.append((current, end, newline_count + 1 - current_line))
+        return pieces
+
+    def split_chunks(self, max_bytes):
+        """按字节数上限划分剪贴板分段（ScriptPart 列表）
+
+        先在分组边界处切分（见 split_parts），单个分组仍超过上限时再在命令边界处切分。
+        """
+        chunks = []
+        for part in self.split_parts(max_bytes):
+            if part.size <= max_bytes or len(part.groups) > 1:
+                chunks.append(part)
+                continue
+
+            *prefix, (start, end) = part.ranges
+            prefix_size = sum(range_end - range_start + 1 for range_start, range_end in prefix)
+            pieces = self._split_range(start, end, max(1, max_bytes - prefix_size))
+            prefix_lines = part.lines - sum(lines for _, _, lines in pieces)
+            for piece_start, piece_end, lines in pieces:
+                chunks.append(ScriptPart(part.groups, prefix + [(piece_start, piece_end)],
+                                         prefix_size + piece_end - piece_start + 1, prefix_lines + lines))
+        return chunks
+
+    def read_part(self, part):
+        """读取一个分卷或分段的文本，各字节范围以换行连接"""
+        return b'\n'.join(self.read_bytes(start, end) for start, end in part.ranges).decode('utf-8')
+
+    def read_text(self):
+        """读取全部命令文本"""
+        return self.read_bytes(0, self.size).decode('utf-8')
+
+    def iter_text(self, chunk_size=READ_CHUNK_SIZE):
+        """按块读取全部命令文本（生成器）"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        position = 0
+        while position < self.size:
+            data = self.read_bytes(position, position + chunk_size)
+            position += len(data)
+            yield decoder.decode(data, final=position >= self.size)
+
+    def save(self, path):
+        """把缓存的命令文本保存到文件"""
+        with open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            for text in self.iter_text():
+                f.write(text)
+
+    def search(self, query, start_line=0):
+        """从第 start_line 行开始查找包含 query 的第一行，返回行号；找不到时返回 None"""
+        needle = query.encode('utf-8')
+        if not needle or b'\n' in needle or start_line >= self.line_count:
+            return None
+
+        block = start_line // LINE_INDEX_STEP
+        with self._lock:
+            self._file.seek(self._line_offsets[block])
+            line = block * LINE_INDEX_STEP
+            for _ in range(start_line - line):
+                self._file.readline()
+            line = start_line
+
+            while True:
+                # 每块补齐到行尾，保证匹配不会跨块
+                chunk = self._file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    return None
+                chunk += self._file.readline()
+                position = chunk.find(needle)
+                if position >= 0:
+                    return line + chunk.count(b'\n', 0, position)
+                line += chunk.count(b'\n')
+
+    def acquire(self):
+        """登记一个仍在读取的使用者，在其 release 之前 close 不会关闭临时文件"""
+        with self._lock:
+            self._users += 1
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._close_pending and not self._users:
+                self._file.close()
+
+    def close(self):
+        """关闭临时文件；仍有使用者时推迟到最后一个使用者 release 之后"""
+        with self._lock:
+            self._close_pending = True
+            if not self._users:
+                self._file.close()
+
+
+def _write_script(f, output, part, cancel_event=None):
+    """写出一个分卷：各字节范围以换行分隔并以换行结尾，行首的 # 注释改为脚本注释 ;"""
+    for start, end in part.ranges:
+        line_start = True
+        for position in range(start, end, READ_CHUNK_SIZE):
+            check_cancelled(cancel_event)
+            data = output.read_bytes(position, min(position + READ_CHUNK_SIZE, end)).replace(b'\n#', b'\n;')
+            if line_start and data[:1] == b'#':
+                data = b';' + data[1:]
+            f.write(data)
+            line_start = data.endswith(b'\n')
+        f.write(b'\n')
+
+
+def export_script_parts(output, path, max_bytes=None, max_lines=None, cancel_event=None):
+    """把 CommandOutput 中的命令写成编号的 AutoCAD 脚本文件（.scr），并写出分卷清单
+
+    path 为脚本路径，例如 "结果.scr" 写出 结果_001.scr、结果_002.scr……和 结果_清单.json。
+    各分卷只在分组边界处切分，见 CommandOutput.split_parts。返回清单内容（dict）。
+    """
+    base, extension = os.path.splitext(path)
+    extension = extension or ".scr"
+    parts = output.split_parts(max_bytes, max_lines)
+    width = max(3, len(str(len(parts))))
+
+    manifest = {"max_bytes": max_bytes, "max_lines": max_lines, "parts": []}
+    for number, part in enumerate(parts, 1):
+        part_path = f"{base}_{number:0{width}d}{extension}"
+        with open(part_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            _write_script(f, output, part, cancel_event)
+        manifest["parts"].append({
+            "file": os.path.basename(part_path),
+            "bytes": part.size,
+            "lines": part.lines,
+            "groups": part.groups,
+            "oversize": (max_bytes is not None and part.size > max_bytes
+                         or max_lines is not None and part.lines > max_lines),
+        })
+
+    with open(f"{base}_清单.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def _load_store(path, encoding, progress, cancel_event, group_names, workers, keep_text, cache=False):
+    """解析整个文件，或在指定 group_names 时只通过分组索引解析这些分组
+
+    cache 为 True 时优先使用解析缓存和坐标文件旁的二进制缓存，解析整个文件后写入二进制缓存。
+    """
+    if cache:
+        store = get_cached_store(path, encoding, keep_text)
+        if store is not None:
+            return store if group_names is None else select_groups(store, group_names)
+        if group_names is None:
+            return parse_coordinate_file_cached(path, encoding, progress, cancel_event, workers, keep_text)
+    if group_names is None:
+        return parse_coordinate_file(path, encoding, progress, cancel_event, workers, keep_text)
+    return load_groups(path, group_names, encoding, cancel_event, keep_text)
+
+
+def convert_file(path, convert_type="line", grouped=True, encoding='utf-8', progress=None, cancel_event=None,
+                 group_names=None, workers=None, precision=None, text_format="commands", cache=False):
+    """转换单个坐标文件
+
+    返回 (cad_commands, store)。文件中没有有效坐标时 cad_commands 为 None。
+    group_names 不为 None 时只转换这些分组；workers 为并行解析和并行生成的进程数，
+    见 parse_coordinate_file 和 iter_conversion_commands；
+    precision 为坐标保留的小数位数，None 表示完整精度；text_format 见 TEXT_FORMATS；
+    cache 为 True 时使用并写入坐标文件旁的二进制缓存（见 parse_coordinate_file_cached）。
+    """
+    if convert_type not in CONVERT_TYPES:
+        raise ValueError(f"不支持的转换类型: {convert_type}")
+
+    store = _load_store(path, encoding, progress, cancel_event, group_names, workers,
+                        precision == SOURCE_PRECISION, cache)
+    if not len(store):
+        return None, store
+
+    cad_commands = "\n".join(iter_conversion_commands(store, convert_type, grouped, cancel_event,
+                                                      precision=precision, text_format=text_format,
+                                                      workers=workers))
+    return cad_commands, store
+
+
+def export_file(path, output, convert_type="line", grouped=True, encoding='utf-8', progress=None, cancel_event=None,
+                group_names=None, workers=None, precision=None, text_format="commands", cache=False):
+    """转换单个坐标文件并直接写入 output（路径或文本文件对象），不在内存中拼接完整结果
+
+    返回 CoordinateStore；文件中没有有效坐标时不写入任何内容。
+    group_names、workers、precision、text_format、cache 的含义同 convert_file。
+    """
+    if convert_type not in CONVERT_TYPES:
+        raise ValueError(f"不支持的转换类型: {convert_type}")
+
+    store = _load_store(path, encoding, progress, cancel_event, group_names, workers,
+                        precision == SOURCE_PRECISION, cache)
+    if len(store):
+        write_cad_commands(output, iter_conversion_commands(store, convert_type, grouped, cancel_event,
+                                                            precision=precision, text_format=text_format,
+                                                            workers=workers),
+                           cancel_event)
+    return store
+
+
+def _iter_file_blocks(path, encoding, keep_text, group_names, progress=None, cancel_event=None):
+    """边读取边解析坐标文件，逐块产生非空的 (坐标数组, 坐标原文数组或 None)；遇到的分组名加入集合 group_names"""
+    current_group = DEFAULT_GROUP
+    line_count = 0
+    valid_coords = 0
+
+    with open(path, 'r', encoding=encoding) as f:
+        for block in iter_text_blocks(f):
+            check_cancelled(cancel_event)
+            block_pieces, current_group = parse_text_block(block, current_group, keep_text=keep_text)
+            line_count += block.count('\n')
+            for group_name, points, *texts in block_pieces:
+                group_names.add(group_name)
+                if len(points):
+                    valid_coords += len(points)
+                    yield points, texts[0] if texts else None
+            if progress:
+                progress(f.buffer.tell(), line_count, valid_coords)
+
+
+def stream_export_file(path, output, convert_type="line", encoding='utf-8', progress=None, cancel_event=None,
+                       precision=None):
+    """不分组的流式转换：边读取、解析边生成命令写入 output（路径或文本文件对象），结果与 export_file(grouped=False) 相同
+
+    内存中只保留当前读取的一块坐标，占用与文件大小无关。命令正文先写入临时文件，读完后坐标总数已知，
+    再写出开头的说明行并复制正文。先按二维格式输出，遇到非零Z坐标时按三维格式从头重新转换。
+    返回 StreamResult；文件中没有有效坐标时不写入任何内容。
+    """
+    if convert_type not in CONVERT_TYPES:
+        raise ValueError(f"不支持的转换类型: {convert_type}")
+
+    with tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as body:
+        for has_z_coords in (False, True):
+            group_names = set()
+            count = 0
+            found_z = False
+
+            def iter_blocks():
+                nonlocal count, found_z
+                for points, texts in _iter_file_blocks(path, encoding, precision == SOURCE_PRECISION, group_names,
+                                                       progress, cancel_event):
+                    if not has_z_coords and (points[:, 2] != 0).any():
+                        found_z = True
+                        return
+                    count += len(points)
+                    yield points, texts
+
+            body.seek(0)
+            body.truncate()
+            body_size = write_cad_commands(body, _iter_command_body(iter_blocks(), convert_type, has_z_coords,
+                                                                    precision),
+                                           cancel_event)
+            if not found_z:
+                break
+
+        result = StreamResult(count, len(group_names), has_z_coords)
+        if not count:
+            return result
+
+        if not hasattr(output, 'write'):
+            f = open(output, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+        else:
+            f = output
+        try:
+            write_cad_commands(f, _command_header(convert_type, count, has_z_coords))
+            if body_size:
+                # 只有一个点的直线命令没有正文
+                f.write("\n")
+            body.seek(0)
+            while True:
+                check_cancelled(cancel_event)
+                text = body.read(READ_CHUNK_SIZE)
+                if not text:
+                    break
+                f.write(text)
+        finally:
+            if f is not output:
+                f.close()
+    return result
+
+
+def export_script_file(path, output, convert_type="line", grouped=True, encoding='utf-8', progress=None,
+                       cancel_event=None, group_names=None, workers=None, precision=None, text_format="commands",
+                       max_bytes=None, max_lines=None, cache=False):
+    """转换单个坐标文件并写成按大小分卷的脚本文件，output 为脚本路径（见 export_script_parts）
+
+    返回 CoordinateStore；文件中没有有效坐标时不写入任何内容。其余参数含义同 convert_file。
+    """
+    if convert_type not in CONVERT_TYPES:
+        raise ValueError(f"不支持的转换类型: {convert_type}")
+
+    store = _load_store(path, encoding, progress, cancel_event, group_names, workers,
+                        precision == SOURCE_PRECISION, cache)
+    if len(store):
+        commands = CommandOutput()
+        try:
+            commands.write(iter_conversion_commands(store, convert_type, grouped, cancel_event,
+                                                    on_group=commands.mark_group, precision=precision,
+                                                    text_format=text_format, workers=workers),
+                           cancel_event)
+            export_script_parts(commands, output, max_bytes, max_lines, cancel_event)
+        finally:
+            commands.close()
+    return store
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CAD坐标转换器 - 预览抽稀
+版本: 1.4.0
+作者: ViVi141
+邮箱: 747384120@qq.com
+描述: 按画布分辨率抽稀图形预览的坐标，保留折线的拐角和尖峰，
+      绘图耗时只与画布大小有关，与坐标点数无关。不依赖matplotlib
+"""
+
+import numpy as np
+
+# 折线抽稀后最多保留的分段数为画布长边像素数的倍数，每段最多保留6个点
+LINE_BUCKETS_PER_PIXEL = 2
+
+# 点抽稀时的网格大小（像素）：同一网格内只显示一个点
+POINT_CELL_PIXELS = 2
+
+# 多分辨率金字塔：最细一层的网格数（按坐标范围的长边计），相邻两层网格大小之比，
+# 以及最粗一层的点数上限；点数不超过 PYRAMID_MIN_POINTS 时只保留原始坐标一层
+PYRAMID_FINEST_CELLS = 65536
+PYRAMID_FACTOR = 4
+PYRAMID_MIN_POINTS = 20000
+
+# 金字塔每层按连续的 PYRAMID_CHUNK 个点分块记录坐标范围，查询时只检查与可见范围相交的块
+PYRAMID_CHUNK = 4096
+
+
+def data_bounds(points):
+    """坐标的显示范围 (x_min, x_max, y_min, y_max)；没有坐标时返回 None"""
+    if not len(points):
+        return None
+    x = points[:, 0]
+    y = points[:, 1]
+    return float(x.min()), float(x.max()), float(y.min()), float(y.max())
+
+
+def merge_bounds(bounds_list):
+    """合并多个显示范围，忽略 None"""
+    bounds_list = [bounds for bounds in bounds_list if bounds is not None]
+    if not bounds_list:
+        return None
+    x_min, x_max, y_min, y_max = zip(*bounds_list)
+    return min(x_min), max(x_max), min(y_min), max(y_max)
+
+
+def line_budget(size):
+    """画布大小 (宽, 高) 像素对应的折线抽稀点数上限"""
+    return 6 * LINE_BUCKETS_PER_PIXEL * max(int(size[0]), int(size[1]), 1)
+
+
+def pixel_scale(bounds, size, cell_pixels=1):
+    """显示范围 bounds 在 size 像素的画布中每个网格（cell_pixels 像素）对应的坐标长度；X、Y使用相同比例"""
+    x_min, x_max, y_min, y_max = bounds
+    width = max(int(size[0]) // cell_pixels, 1)
+    height = max(int(size[1]) // cell_pixels, 1)
+    return max((x_max - x_min) / width, (y_max - y_min) / height)
+
+
+def _grid_cells(points, origin, scale):
+    """每个点所在网格的编号，网格从 origin (x, y) 开始、边长为 scale"""
+    if not len(points) or not scale > 0:
+        return np.zeros(len(points), dtype=np.int64)
+    columns = np.floor((points[:, 0] - origin[0]) / scale).astype(np.int64)
+    rows = np.floor((points[:, 1] - origin[1]) / scale).astype(np.int64)
+    # 显示范围外的点落在边框外的网格里，编号同样互不相同
+    return columns * (np.int64(rows.max()) - rows.min() + 1) + (rows - rows.min())
+
+
+def _pixel_cells(points, bounds, size, cell_pixels=1):
+    """每个点所在像素格的编号（与等比例尺显示一致）"""
+    return _grid_cells(points, (bounds[0], bounds[2]), pixel_scale(bounds, size, cell_pixels))
+
+
+def _collapse_runs(cells, breaks=None):
+    """同一网格内的连续点只保留首尾点，返回保留的行号；breaks 为折线断开处（新一段的起始行）"""
+    count = len(cells)
+    change = cells[1:] != cells[:-1]
+    if breaks is not None and len(breaks):
+        change[breaks - 1] = True
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    keep[1:] |= change
+    keep[:-1] |= change
+    return np.flatnonzero(keep)
+
+
+def _bucket_extrema(points, index, max_points):
+    """把 index 指向的连续点平均分段，每段只保留首尾点和X、Y的最小、最大值点"""
+    buckets = max(max_points // 6, 1)
+    count = len(index)
+    size = -(-count // buckets)
+    # 最后一段不足时重复最后一个点补齐，便于按二维数组一次计算
+    slots = np.minimum(np.arange(buckets * size), count - 1).reshape(buckets, size)
+    rows = np.arange(buckets)
+    keep = [slots[:, 0], slots[:, -1]]
+    for column in (0, 1):
+        values = points[index[slots], column]
+        keep.append(slots[rows, values.argmin(axis=1)])
+        keep.append(slots[rows, values.argmax(axis=1)])
+    return index[np.unique(np.concatenate(keep))]
+
+
+def decimate_line(points, bounds, size, max_points=None, breaks=None):
+    """折线抽稀，返回按原顺序保留的点的行号
+
+    先合并落在同一像素内的连续点（只保留每段的首尾点，显示效果不变）；
+    剩余点仍超过 max_points（默认按画布大小计算）时再平均分段，每段保留首尾点和X、Y的极值点，
+    因此拐角和尖峰不会像等间隔采样那样被跳过。
+    breaks 为折线断开处（新一段的起始行），点数未超过上限时断开处两侧的点总是保留。
+    """
+    count = len(points)
+    if count <= 2:
+        return np.arange(count)
+    if max_points is None:
+        max_points = line_budget(size)
+
+    index = _collapse_runs(_pixel_cells(points, bounds, size), breaks)
+    if len(index) > max_points:
+        index = _bucket_extrema(points, index, max_points)
+    return index
+
+
+def decimate_points(points, bounds, size):
+    """散点抽稀：每个 POINT_CELL_PIXELS 大小的网格只保留第一个点，返回按原顺序排列的行号"""
+    if len(points) <= 1:
+        return np.arange(len(points))
+    cells = _pixel_cells(points, bounds, size, POINT_CELL_PIXELS)
+    _, first = np.unique(cells, return_index=True)
+    first.sort()
+    return first
+
+
+def line_segments(points, dims=2):
+    """相邻点之间的线段数组 (N-1) x 2 x dims，供 LineCollection 一次绘制全部直线段；跳过端点为 NaN（断开处）的线段"""
+    points = points[:, :dims]
+    segments = np.stack([points[:-1], points[1:]], axis=1)
+    return segments[np.isfinite(segments).all(axis=(1, 2))]
+
+
+def decimate(points, convert_type, bounds, size, max_points=None):
+    """按转换类型抽稀：点只按网格去重，多段线和直线保持折线形状；返回抽稀后的坐标数组"""
+    if not len(points):
+        return points
+    if convert_type == "point":
+        index = decimate_points(points, bounds, size)
+    else:
+        index = decimate_line(points, bounds, size, max_points)
+    if len(index) == len(points):
+        return points
+    return points[index]
+
+
+def _chunk_ranges(count, chunks, extra=0):
+    """chunks（升序）中各块包含的位置；extra 为1时各块还包括下一块的第一个点（下一块也选中时不重复）"""
+    starts = chunks * PYRAMID_CHUNK
+    ends = starts + PYRAMID_CHUNK
+    if extra:
+        ends[:-1] += np.diff(chunks) != 1
+        ends[-1] += 1
+    lengths = np.minimum(ends, count) - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(lengths.sum()) + offsets
+
+
+class _PyramidLevel:
+    """金字塔的一层：保留点在原坐标中的行号，以及按块记录的坐标范围"""
+
+    def __init__(self, points, index, cell, connected):
+        self.index = index
+        self.cell = cell
+        values = points[index]
+        x = values[:, 0]
+        y = values[:, 1]
+        starts = np.arange(0, len(index), PYRAMID_CHUNK)
+        self.x_min = np.minimum.reduceat(x, starts)
+        self.x_max = np.maximum.reduceat(x, starts)
+        self.y_min = np.minimum.reduceat(y, starts)
+        self.y_max = np.maximum.reduceat(y, starts)
+        if connected and len(starts) > 1:
+            # 折线块之间的连接线段归前一块，范围扩展到下一块的第一个点
+            following = starts[1:]
+            for bound, combine, column in ((self.x_min, np.minimum, x), (self.x_max, np.maximum, x),
+                                           (self.y_min, np.minimum, y), (self.y_max, np.maximum, y)):
+                bound[:-1] = combine(bound[:-1], column[following])
+
+    def chunks_in(self, window):
+        """与可见范围相交的块号"""
+        x_min, x_max, y_min, y_max = window
+        return np.flatnonzero((self.x_min <= x_max) & (self.x_max >= x_min) &
+                              (self.y_min <= y_max) & (self.y_max >= y_min))
+
+
+class PreviewPyramid:
+    """二维图形预览的多分辨率金字塔
+
+    第0层为原始坐标，之后各层的网格依次放大 PYRAMID_FACTOR 倍，并按 decimate 的方式合并同一网格内的点
+    （折线保留每段连续点的首尾点，散点每个网格保留第一个点）。缩放或平移后，
+    query 选择网格不大于一个像素的最粗一层，只取出与可见范围相交的部分再按画布分辨率抽稀，
+    因此任意缩放级别下都既快又准确。
+    """
+
+    def __init__(self, points, convert_type, bounds=None):
+        self.points = points
+        self.connected = convert_type != "point"
+        self.levels = [_PyramidLevel(points, np.arange(len(points)), 0.0, self.connected)]
+        if bounds is None:
+            bounds = data_bounds(points)
+        if len(points) <= PYRAMID_MIN_POINTS or bounds is None:
+            return
+
+        x_min, x_max, y_min, y_max = bounds
+        extent = max(x_max - x_min, y_max - y_min)
+        cell = extent / PYRAMID_FINEST_CELLS
+        index = self.levels[0].index
+        while cell > 0 and len(index) > PYRAMID_MIN_POINTS and cell < extent:
+            cells = _grid_cells(points[index], (x_min, y_min), cell)
+            if self.connected:
+                merged = index[_collapse_runs(cells)]
+            else:
+                _, first = np.unique(cells, return_index=True)
+                first.sort()
+                merged = index[first]
+            # 点数减少不到一半的层不值得保存，直接尝试更大的网格
+            if len(merged) <= len(index) // 2:
+                index = merged
+                self.levels.append(_PyramidLevel(points, index, cell, self.connected))
+            cell *= PYRAMID_FACTOR
+
+    def level_for(self, scale):
+        """网格不大于 scale（一个像素对应的坐标长度）的最粗一层"""
+        level = self.levels[0]
+        for candidate in self.levels[1:]:
+            if candidate.cell > scale:
+                break
+            level = candidate
+        return level
+
+    def query(self, window, size, max_points=None):
+        """可见范围 window (x_min, x_max, y_min, y_max) 在 size 像素的画布中显示的坐标
+
+        折线中不相连的部分之间插入一行 NaN，绘图时在此断开。
+        """
+        level = self.level_for(pixel_scale(window, size))
+        chunks = level.chunks_in(window)
+        if not len(chunks):
+            return self.points[:0]
+        positions = _chunk_ranges(len(level.index), chunks, 1 if self.connected else 0)
+        points = self.points[level.index[positions]]
+        x_min, x_max, y_min, y_max = window
+
+        if not self.connected:
+            inside = ((points[:, 0] >= x_min) & (points[:, 0] <= x_max) &
+                      (points[:, 1] >= y_min) & (points[:, 1] <= y_max))
+            points = points[inside]
+            return points[decimate_points(points, window, size)]
+
+        # 保留与可见范围相交的线段（按线段的外接矩形判断）的端点，以及可见范围内的孤立点
+        x = points[:, 0]
+        y = points[:, 1]
+        hit = ((np.minimum(x[:-1], x[1:]) <= x_max) & (np.maximum(x[:-1], x[1:]) >= x_min) &
+               (np.minimum(y[:-1], y[1:]) <= y_max) & (np.maximum(y[:-1], y[1:]) >= y_min) &
+               (np.diff(positions) == 1))
+        keep = (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+        keep[:-1] |= hit
+        keep[1:] |= hit
+        kept = np.flatnonzero(keep)
+        if not len(kept):
+            return self.points[:0]
+        points = points[kept]
+        # 相邻的保留点之间没有相交线段时折线在此断开
+        breaks = np.flatnonzero((np.diff(kept) != 1) | ~hit[kept[:-1]]) + 1
+
+        index = decimate_line(points, window, size, max_points, breaks)
+        # 两个保留点之间有断开处时插入 NaN
+        return np.insert(points[index], np.unique(np.searchsorted(index, breaks)), np.nan, axis=0)